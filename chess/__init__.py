@@ -2,4 +2,5 @@ from .game import *
 from .constants import *
 from .board import *
 from .moves import *
-from .pieces import *
\ No newline at end of file
+from .pieces import *
+from .epd import *
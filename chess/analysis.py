@@ -0,0 +1,115 @@
+import multiprocessing
+import queue
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .board import *
+from .engine import *
+
+
+@dataclass(frozen=True)
+class SearchUpdate:
+    search_id: int
+    result: SearchResult
+    finished: bool      # True for the final result of the search, False for an intermediate iteration
+
+
+def _serve_searches(commands, updates, table_size: int):
+    # Worker process: run searches one at a time while a listener thread handles stop requests
+    engine = Engine(table_size)
+    searches = queue.Queue()
+    cancelled = [0]     # Highest cancelled search id
+
+    def listen():
+        while True:
+            command = commands.get()
+            if command[0] == "stop":
+                cancelled[0] = max(cancelled[0], command[1])
+                engine.stop()
+            else:
+                searches.put(command)
+                if command[0] == "quit":
+                    engine.stop()
+                    return
+
+    threading.Thread(target=listen, daemon=True).start()
+    while True:
+        command = searches.get()
+        if command[0] == "quit":
+            return
+        _, search_id, fen, moves, depth, time_limit = command
+        if search_id <= cancelled[0]:
+            continue
+        engine.reset_stop()
+        board = Board(fen)
+        for move in moves:
+            board.perform_move(move)
+
+        def info(result: SearchResult):
+            if search_id <= cancelled[0]:
+                # The stop arrived just before the search started
+                engine.stop()
+            updates.put(SearchUpdate(search_id, result, False))
+
+        updates.put(SearchUpdate(search_id, engine.search(board, depth, time_limit, info, keep_stop=True), True))
+
+
+class SearchWorker:
+    # Runs engine searches in a separate process, one at a time, so a search never holds the caller's
+    # interpreter lock. Results are posted to a queue, which the caller drains with poll() (for the GUI: from an
+    # after() callback), so the caller never blocks on a search.
+    def __init__(self, table_size: int = TRANSPOSITION_TABLE_SIZE):
+        # Spawn rather than fork: forking a process that has a Tk interpreter is not safe on every platform
+        context = multiprocessing.get_context("spawn")
+        self._commands = context.Queue()
+        self._updates = context.Queue()
+        self._process = context.Process(target=_serve_searches, args=(self._commands, self._updates, table_size),
+                                        name="search-worker", daemon=True)
+        self._process.start()
+        self._search_id = 0
+        self._running_id: Optional[int] = None
+
+    def start(self, board: Board, depth: Optional[int] = None, time_limit: Optional[float] = None) -> int:
+        # Cancel any running search and search a snapshot of board; returns the id of the new search
+        self.cancel()
+        self._search_id += 1
+        # Ship the root position and the moves played since, so the worker sees the repetition history too
+        root = board.copy()
+        moves = []
+        while root.move_stack:
+            moves.append(root.pop())
+        moves.reverse()
+        self._commands.put(("search", self._search_id, root.fen(), moves, depth, time_limit))
+        self._running_id = self._search_id
+        return self._search_id
+
+    def cancel(self):
+        # Stop the running search, if any; its pending results are discarded
+        if self._running_id is not None:
+            self._commands.put(("stop", self._running_id))
+            self._running_id = None
+
+    def is_running(self) -> bool:
+        # True until the final result of the current search has been returned by poll()
+        return self._running_id is not None
+
+    def poll(self) -> List[SearchUpdate]:
+        # Everything posted by the current search since the last poll, without blocking
+        updates = []
+        while True:
+            try:
+                update = self._updates.get_nowait()
+            except queue.Empty:
+                return updates
+            if update.search_id == self._running_id:
+                updates.append(update)
+                if update.finished:
+                    self._running_id = None
+
+    def close(self):
+        self.cancel()
+        self._commands.put(("quit",))
+        self._process.join(timeout=1)
+        if self._process.is_alive():
+            self._process.terminate()
@@ -0,0 +1,259 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from dataclasses import dataclass, field
+from os import PathLike
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+from .board import *
+from .pgn import read_pgn
+
+# An archive is two files. The data file is a header followed by one record per game:
+#   record header (_RECORD): tag block length, move count, result code
+#   tag block: UTF-8 'name\0value\0name\0value...'
+#   moves: one little-endian 16-bit code per ply (encode_move)
+# The index file (data path + INDEX_SUFFIX) is a header followed by the 64-bit offset of every record, so game N
+# is found without reading the games before it. Both files are only ever appended to.
+DATA_MAGIC = b"CHESSGA1"
+INDEX_MAGIC = b"CHESSGI1"
+INDEX_SUFFIX = ".idx"
+
+_RECORD = struct.Struct("<IIB")
+_OFFSET = struct.Struct("<Q")
+RESULTS = ["*", "1-0", "0-1", "1/2-1/2"]     # Game results by result code
+_PROMOTION_CODES = {None: 0, PieceType.KNIGHT: 1, PieceType.BISHOP: 2, PieceType.ROOK: 3, PieceType.QUEEN: 4}
+
+
+def _move_codes() -> Dict[Move, int]:
+    codes = {}
+    for from_index in range(64):
+        for to_index in range(64):
+            move = MOVES[from_index][to_index]
+            if move is not None:
+                codes[move] = from_index | to_index << 6
+            for promotion in PROMOTION_MOVES[from_index][to_index]:
+                codes[promotion] = from_index | to_index << 6 | _PROMOTION_CODES[promotion.promotion] << 12
+    return codes
+
+
+# 16-bit move codes: bits 0-5 from square, 6-11 to square, 12-14 promotion (none, knight, bishop, rook, queen)
+MOVE_CODES: Dict[Move, int] = _move_codes()
+MOVES_BY_CODE: List[Optional[Move]] = [None] * (1 << 15)
+for _move, _code in MOVE_CODES.items():
+    MOVES_BY_CODE[_code] = _move
+
+
+def encode_move(move: Move) -> int:
+    try:
+        return MOVE_CODES[move]
+    except KeyError:
+        raise InvalidMoveError(f"Move {move} has no archive code") from None
+
+
+def decode_move(code: int) -> Move:
+    move = MOVES_BY_CODE[code] if 0 <= code < len(MOVES_BY_CODE) else None
+    if move is None:
+        raise InvalidMoveError(f"Invalid archive move code {code:#06x}")
+    return move
+
+
+@dataclass(frozen=True)
+class ArchivedGame:
+    headers: Dict[str, str] = field(default_factory=dict)
+    moves: List[Move] = field(default_factory=list)
+    result: str = "*"
+
+    def board(self) -> Board:
+        # Starting position, from the FEN tag if there is one
+        fen = self.headers.get("FEN")
+        return Board(fen) if fen else Board()
+
+
+class ArchiveWriter:
+    # Appends games to an archive, creating it if needed. Every game is written as it comes, so ingesting a corpus
+    # of any size keeps only one game in memory.
+    def __init__(self, path: str | PathLike):
+        self.path = path
+        self._data = open(path, "ab")
+        self._index = open(os.fspath(path) + INDEX_SUFFIX, "ab")
+        if self._data.tell() == 0:
+            self._data.write(DATA_MAGIC)
+        if self._index.tell() == 0:
+            self._index.write(INDEX_MAGIC)
+        self.count = (self._index.tell() - len(INDEX_MAGIC)) // _OFFSET.size     # Games in the archive
+
+    def append(self, headers: Dict[str, str], moves: Iterable[Move], result: str = "*") -> int:
+        # Write a game and return its number; the moves are not checked for legality
+        tags = "\0".join(f"{name}\0{value}" for name, value in headers.items()).encode("utf-8")
+        codes = [encode_move(move) for move in moves]
+        offset = self._data.tell()
+        self._data.write(_RECORD.pack(len(tags), len(codes), RESULTS.index(result) if result in RESULTS else 0))
+        self._data.write(tags)
+        self._data.write(struct.pack(f"<{len(codes)}H", *codes))
+        self._index.write(_OFFSET.pack(offset))
+        self.count += 1
+        return self.count - 1
+
+    def append_board(self, board: Board, headers: Optional[Dict[str, str]] = None, result: Optional[str] = None) -> int:
+        # Write the game played on board, from the position its move stack starts at
+        root = board.copy()
+        while root.move_stack:
+            root.pop()
+        headers = dict(headers or {})
+        if root.fen() != STARTING_FEN:
+            headers.setdefault("SetUp", "1")
+            headers["FEN"] = root.fen()
+        if result is None:
+            outcome = board.outcome()
+            result = outcome.result() if outcome else "*"
+        return self.append(headers, board.move_stack, result)
+
+    def flush(self):
+        self._data.flush()
+        self._index.flush()
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _map(path: str | PathLike, magic: bytes) -> mmap.mmap:
+    with open(path, "rb") as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:len(magic)] != magic:
+        data.close()
+        raise ValueError(f"{path} is not a game archive file")
+    return data
+
+
+class GameArchive:
+    # Memory-mapped reader: game N is read from its offset in the index, without parsing the others
+    def __init__(self, path: str | PathLike):
+        self.path = path
+        self._data = _map(path, DATA_MAGIC)
+        self._index = _map(os.fspath(path) + INDEX_SUFFIX, INDEX_MAGIC)
+        self._size = (len(self._index) - len(INDEX_MAGIC)) // _OFFSET.size
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._size
+
+    def _record(self, n: int) -> tuple:
+        # (offset of the tag block, tag block length, move count, result code) of game n
+        if not 0 <= n < self._size:
+            raise IndexError(f"Game {n} is not in the archive ({self._size} games)")
+        offset = _OFFSET.unpack_from(self._index, len(INDEX_MAGIC) + n * _OFFSET.size)[0]
+        return (offset + _RECORD.size,) + _RECORD.unpack_from(self._data, offset)
+
+    def headers(self, n: int) -> Dict[str, str]:
+        start, tag_length, _, _ = self._record(n)
+        if not tag_length:
+            return {}
+        fields = self._data[start:start + tag_length].decode("utf-8").split("\0")
+        return dict(zip(fields[::2], fields[1::2]))
+
+    def move_codes(self, n: int) -> tuple:
+        start, tag_length, move_count, _ = self._record(n)
+        return struct.unpack_from(f"<{move_count}H", self._data, start + tag_length)
+
+    def moves(self, n: int) -> List[Move]:
+        return [decode_move(code) for code in self.move_codes(n)]
+
+    def result(self, n: int) -> str:
+        return RESULTS[self._record(n)[3]]
+
+    def __getitem__(self, n: int) -> ArchivedGame:
+        return ArchivedGame(self.headers(n), self.moves(n), self.result(n))
+
+    def __iter__(self) -> Iterator[ArchivedGame]:
+        for n in range(self._size):
+            yield self[n]
+
+    def replay(self, n: int, board: Optional[Board] = None) -> Board:
+        # Set board (a new one by default) to the start of game n and play its moves onto it, so its move stack
+        # is the game. Moves were legal when archived and are not checked again.
+        fen = self.headers(n).get("FEN", STARTING_FEN)
+        if board is None:
+            board = Board(fen)
+        else:
+            board.set_fen(fen)
+        for move in self.moves(n):
+            board.perform_move(move)
+        return board
+
+
+def ingest_pgn(source: str | PathLike | TextIO, writer: ArchiveWriter,
+               errors: Optional[TextIO] = None) -> tuple:
+    # Stream the games of a PGN file into an archive, replaying each to turn its SAN into moves. Games with an
+    # illegal or unreadable move are skipped (and reported on errors). Returns (games written, games skipped).
+    written = skipped = 0
+    for number, game in enumerate(read_pgn(source), 1):
+        try:
+            board = game.board()
+            for san in game.moves:
+                board.perform_move(board.parse_san(san))
+        except ValueError as error:
+            skipped += 1
+            if errors is not None:
+                print(f"game {number}: {error}", file=errors)
+            continue
+        writer.append(game.headers, board.move_stack, game.result)
+        written += 1
+    return written, skipped
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess.archive", description="Binary game archives")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="append the games of PGN files to an archive")
+    ingest.add_argument("archive")
+    ingest.add_argument("pgn", nargs="+")
+    show = commands.add_parser("show", help="print a game of an archive")
+    show.add_argument("archive")
+    show.add_argument("game", type=int, help="game number, from 0")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        started = time.perf_counter()
+        written = skipped = 0
+        with ArchiveWriter(args.archive) as writer:
+            for path in args.pgn:
+                counts = ingest_pgn(path, writer, errors=sys.stderr)
+                written += counts[0]
+                skipped += counts[1]
+            total = writer.count
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(args.archive) + os.path.getsize(os.fspath(args.archive) + INDEX_SUFFIX)
+        print(f"games {written}  skipped {skipped}  archive {total} games, {size} bytes  {elapsed:.2f}s  "
+              f"{written / max(elapsed, 1e-9):.0f} games/s", file=sys.stderr)
+        return 1 if skipped else 0
+
+    with GameArchive(args.archive) as archive:
+        game = archive[args.game]
+        for name, value in game.headers.items():
+            print(f'[{name} "{value}"]')
+        print(" ".join(move.uci() for move in game.moves), game.result)
+        print(archive.replay(args.game).fen())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
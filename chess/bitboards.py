@@ -0,0 +1,171 @@
+from typing import Dict, Iterator, List, Tuple
+
+from .constants import *
+
+# Square i of a bitboard is bit i, with a1 = 0, b1 = 1, ..., h8 = 63 (same order as the Square enum)
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+COLORS = [Color.WHITE, Color.BLACK]
+PIECE_TYPES = [PieceType.PAWN, PieceType.KNIGHT, PieceType.BISHOP, PieceType.ROOK, PieceType.QUEEN, PieceType.KING]
+PIECE_TYPE_INDICES = {piece_type: index for index, piece_type in enumerate(PIECE_TYPES)}
+
+BB_EMPTY = 0
+BB_ALL = 0xffff_ffff_ffff_ffff
+
+BB_SQUARES = [1 << i for i in range(64)]
+
+BB_FILES = [0x0101_0101_0101_0101 << i for i in range(8)]
+BB_RANKS = [0xff << (8 * i) for i in range(8)]
+
+BB_FILE_A, BB_FILE_B, BB_FILE_C, BB_FILE_D, BB_FILE_E, BB_FILE_F, BB_FILE_G, BB_FILE_H = BB_FILES
+BB_RANK_1, BB_RANK_2, BB_RANK_3, BB_RANK_4, BB_RANK_5, BB_RANK_6, BB_RANK_7, BB_RANK_8 = BB_RANKS
+
+BB_A1, BB_B1, BB_C1, BB_D1, BB_E1, BB_F1, BB_G1, BB_H1 = BB_SQUARES[:8]
+BB_A2, BB_B2, BB_C2, BB_D2, BB_E2, BB_F2, BB_G2, BB_H2 = BB_SQUARES[8:16]
+BB_A3, BB_B3, BB_C3, BB_D3, BB_E3, BB_F3, BB_G3, BB_H3 = BB_SQUARES[16:24]
+BB_A4, BB_B4, BB_C4, BB_D4, BB_E4, BB_F4, BB_G4, BB_H4 = BB_SQUARES[24:32]
+BB_A5, BB_B5, BB_C5, BB_D5, BB_E5, BB_F5, BB_G5, BB_H5 = BB_SQUARES[32:40]
+BB_A6, BB_B6, BB_C6, BB_D6, BB_E6, BB_F6, BB_G6, BB_H6 = BB_SQUARES[40:48]
+BB_A7, BB_B7, BB_C7, BB_D7, BB_E7, BB_F7, BB_G7, BB_H7 = BB_SQUARES[48:56]
+BB_A8, BB_B8, BB_C8, BB_D8, BB_E8, BB_F8, BB_G8, BB_H8 = BB_SQUARES[56:]
+
+BB_DARK_SQUARES = 0xaa55_aa55_aa55_aa55
+BB_LIGHT_SQUARES = 0x55aa_55aa_55aa_55aa
+BB_CORNERS = BB_A1 | BB_H1 | BB_A8 | BB_H8
+BB_BACKRANKS = BB_RANK_1 | BB_RANK_8
+
+
+def lsb(bb: int) -> int:
+    return (bb & -bb).bit_length() - 1
+
+
+def msb(bb: int) -> int:
+    return bb.bit_length() - 1
+
+
+def scan_forward(bb: int) -> Iterator[int]:
+    # Yield the index of every set bit, lowest first
+    while bb:
+        r = bb & -bb
+        yield r.bit_length() - 1
+        bb ^= r
+
+
+def popcount(bb: int) -> int:
+    return bin(bb).count('1')
+
+
+def square_rank(index: int) -> int:
+    return index >> 3
+
+
+def square_file(index: int) -> int:
+    return index & 7
+
+
+def square_distance(a: int, b: int) -> int:
+    return max(abs(square_rank(a) - square_rank(b)), abs(square_file(a) - square_file(b)))
+
+
+def _step_attacks(index: int, deltas: List[int], occupied: int = BB_EMPTY) -> int:
+    # Attacks along each delta until the edge of the board or the first occupied square
+    attacks = BB_EMPTY
+    for delta in deltas:
+        target = index
+        while True:
+            target += delta
+            if not 0 <= target < 64 or square_distance(target, target - delta) > 2:
+                break
+            attacks |= BB_SQUARES[target]
+            if occupied & BB_SQUARES[target]:
+                break
+    return attacks
+
+
+def _leaper_attacks(index: int, deltas: List[int]) -> int:
+    attacks = BB_EMPTY
+    for delta in deltas:
+        target = index + delta
+        if 0 <= target < 64 and square_distance(target, index) <= 2:
+            attacks |= BB_SQUARES[target]
+    return attacks
+
+
+KNIGHT_ATTACKS = [_leaper_attacks(i, [17, 15, 10, 6, -17, -15, -10, -6]) for i in range(64)]
+KING_ATTACKS = [_leaper_attacks(i, [9, 8, 7, 1, -9, -8, -7, -1]) for i in range(64)]
+# PAWN_ATTACKS[color][square] are the squares a pawn of that color on that square attacks
+PAWN_ATTACKS = [[_leaper_attacks(i, [7, 9]) for i in range(64)],
+                [_leaper_attacks(i, [-7, -9]) for i in range(64)]]
+
+
+def _edges(index: int) -> int:
+    return (((BB_RANK_1 | BB_RANK_8) & ~BB_RANKS[square_rank(index)]) |
+            ((BB_FILE_A | BB_FILE_H) & ~BB_FILES[square_file(index)]))
+
+
+def _carry_rippler(mask: int) -> Iterator[int]:
+    # Iterate over all subsets of a mask
+    subset = BB_EMPTY
+    while True:
+        yield subset
+        subset = (subset - mask) & mask
+        if not subset:
+            break
+
+
+def _attack_table(deltas: List[int]) -> Tuple[List[int], List[Dict[int, int]]]:
+    # For every square, map each relevant blocker configuration to the resulting attack set
+    mask_table = []
+    attack_table = []
+    for index in range(64):
+        mask = _step_attacks(index, deltas) & ~_edges(index)
+        mask_table.append(mask)
+        attack_table.append({subset: _step_attacks(index, deltas, subset) for subset in _carry_rippler(mask)})
+    return mask_table, attack_table
+
+
+DIAG_MASKS, DIAG_ATTACKS = _attack_table([-9, -7, 7, 9])
+FILE_MASKS, FILE_ATTACKS = _attack_table([-8, 8])
+RANK_MASKS, RANK_ATTACKS = _attack_table([-1, 1])
+
+
+def bishop_attacks(index: int, occupied: int) -> int:
+    return DIAG_ATTACKS[index][DIAG_MASKS[index] & occupied]
+
+
+def rook_attacks(index: int, occupied: int) -> int:
+    return RANK_ATTACKS[index][RANK_MASKS[index] & occupied] | FILE_ATTACKS[index][FILE_MASKS[index] & occupied]
+
+
+def queen_attacks(index: int, occupied: int) -> int:
+    return bishop_attacks(index, occupied) | rook_attacks(index, occupied)
+
+
+def _rays() -> List[List[int]]:
+    # BB_RAYS[a][b] is the full line through squares a and b, or empty if they are not aligned
+    rays = []
+    for a in range(64):
+        rays_from_a = []
+        for b in range(64):
+            if DIAG_ATTACKS[a][0] & BB_SQUARES[b]:
+                rays_from_a.append((DIAG_ATTACKS[a][0] & DIAG_ATTACKS[b][0]) | BB_SQUARES[a] | BB_SQUARES[b])
+            elif RANK_ATTACKS[a][0] & BB_SQUARES[b]:
+                rays_from_a.append(RANK_ATTACKS[a][0] | BB_SQUARES[a])
+            elif FILE_ATTACKS[a][0] & BB_SQUARES[b]:
+                rays_from_a.append(FILE_ATTACKS[a][0] | BB_SQUARES[a])
+            else:
+                rays_from_a.append(BB_EMPTY)
+        rays.append(rays_from_a)
+    return rays
+
+
+def _between(a: int, b: int) -> int:
+    bb = BB_RAYS[a][b] & ((BB_ALL << a) ^ (BB_ALL << b))
+    return bb & (bb - 1)
+
+
+BB_RAYS = _rays()
+# BB_BETWEEN[a][b] are the squares strictly between a and b on a shared line
+BB_BETWEEN = [[_between(a, b) for b in range(64)] for a in range(64)]
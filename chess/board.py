@@ -1,281 +1,898 @@
-from typing import Optional, Iterator, List
-from copy import deepcopy
+import re
+from typing import Optional, Iterator, List, Dict, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+from dataclasses import dataclass
 
 from .moves import *
 from .constants import *
 from .pieces import *
+from .bitboards import *
+from .zobrist import *
+from .evaluation import *
 
 STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
 STARTING_BOARD_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR"
 
+PIECE_SYMBOLS = "PNBRQKpnbrqk"     # FEN symbol of each bitboard index
+LEGAL_MOVE_CACHE_SIZE = 4096    # Positions whose legal move lists are kept per board
+
+# Piece, disambiguating file and rank, target square and promotion of a SAN move other than castling
+SAN_REGEX = re.compile(r"^([NBRQK])?([a-h])?([1-8])?[-x]?([a-h][1-8])(?:=?([NBRQnbrq]))?[+#]?[!?]*\Z")
+SAN_CASTLING = {"O-O": 2, "0-0": 2, "O-O-O": -2, "0-0-0": -2}   # King step of each castling notation
+PIECE_TYPE_INDICES_BY_LETTER = {"N": KNIGHT, "B": BISHOP, "R": ROOK, "Q": QUEEN, "K": KING}
+PIECES = [Piece(PIECE_TYPES[piece_index % 6], COLORS[piece_index // 6]) for piece_index in range(12)]
+
+
+@lru_cache(maxsize=8192)
+def _parse_fen_row(row: str, rank_start: int) -> Tuple[Tuple[Tuple[int, int], ...], int]:
+    # (bitboard index, square mask) of each piece on one FEN rank, plus their Zobrist key.
+    # Ranks repeat a lot across positions, so bulk loading mostly hits this cache.
+    pieces = []
+    zobrist_hash = 0
+    file = 0
+    for symbol in row:
+        if symbol in '12345678':
+            file += int(symbol)
+        else:
+            piece_index = PIECE_SYMBOLS.find(symbol)
+            if piece_index < 0 or file > 7:
+                raise ValueError(f"Invalid FEN rank: {row!r}")
+            pieces.append((piece_index, BB_SQUARES[rank_start + file]))
+            zobrist_hash ^= ZOBRIST_PIECES[piece_index][rank_start + file]
+            file += 1
+    if file != 8:
+        raise ValueError(f"Invalid FEN rank: {row!r}")
+    return tuple(pieces), zobrist_hash
+
+
+def parse_epd_operations(text: str) -> Dict[str, str]:
+    # 'bm Nf3; id "WAC.001";' -> {'bm': 'Nf3', 'id': 'WAC.001'}; semicolons inside quotes are kept
+    if '"' in text:
+        segments = []
+        current = ''
+        quoted = False
+        for char in text:
+            if char == '"':
+                quoted = not quoted
+            elif char == ';' and not quoted:
+                segments.append(current)
+                current = ''
+                continue
+            current += char
+        segments.append(current)
+    else:
+        segments = text.split(';')
+    operations = {}
+    for segment in segments:
+        opcode, _, operand = segment.strip().partition(' ')
+        if opcode:
+            operand = operand.strip()
+            if len(operand) >= 2 and operand[0] == operand[-1] == '"':
+                operand = operand[1:-1]
+            operations[opcode] = operand
+    return operations
+
+
+@dataclass(slots=True)
+class _BoardState:
+    # What perform_move overwrites and pop needs back; everything else follows from the move itself
+    piece_index: int    # Moved piece before any promotion
+    captured_index: int     # -1 if nothing was captured
+    captured_square: int    # Differs from the target square for en passant
+    castling_rights: int
+    ep_square: Optional[Square]
+    halfmove_clock: int
+    zobrist_hash: int
+
+
+@dataclass(frozen=True)
+class Outcome:
+    termination: Termination
+    winner: Optional[Color]     # None for a draw
+
+    def result(self) -> str:
+        if self.winner is None:
+            return "1/2-1/2"
+        return "1-0" if self.winner == Color.WHITE else "0-1"
+
+
+@dataclass(slots=True)
+class _PositionStatus:
+    # Everything the game-end predicates need, evaluated together once per position
+    in_check: bool
+    has_legal_move: bool
+    insufficient_material: bool
+    fifty_moves: bool
+    threefold_repetition: bool
+    outcome: Optional[Outcome]
+
 
 class LegalMoveWrapper:
     # Inner class of Board; wraps LegalMove so that for each turn, legal move list is only calculated once
     def __init__(self, board):
-        self.board = deepcopy(board)
-        self.fullmove_number = board.fullmove_number
+        self.zobrist_hash = board.zobrist_hash()
         self.turn = board.turn
-        self.legal_moves_list = self.board.generate_legal_moves()
+        self.legal_moves_list = board.generate_legal_moves()
+        # Built on first use: legal moves by origin square, then by destination square (several for promotions)
+        self._by_origin: Optional[List[Dict[int, Tuple[Move, ...]]]] = None
+        self._target_masks: Optional[List[int]] = None
+
+    def _build_index(self):
+        by_origin = [{} for _ in range(64)]
+        target_masks = [BB_EMPTY] * 64
+        for move in self.legal_moves_list:
+            from_index = move.from_square.index
+            to_index = move.to_square.index
+            by_origin[from_index][to_index] = by_origin[from_index].get(to_index, ()) + (move,)
+            target_masks[from_index] |= BB_SQUARES[to_index]
+        self._by_origin = by_origin
+        self._target_masks = target_masks
+
+    def targets(self, from_index: int) -> int:
+        # Mask of the squares the piece on from_index can legally move to
+        if self._target_masks is None:
+            self._build_index()
+        return self._target_masks[from_index]
+
+    def between(self, from_index: int, to_index: int) -> Tuple[Move, ...]:
+        # The legal moves from one square to another: none, one, or the four promotions
+        if self._by_origin is None:
+            self._build_index()
+        return self._by_origin[from_index].get(to_index, ())
 
     def __len__(self):
         return len(self.legal_moves_list)
 
     def __iter__(self) -> Iterator[Move]:
-        return self.legal_moves_list
+        return iter(self.legal_moves_list)
 
     def __contains__(self, move: Move) -> bool:
-        # Update this
-        return move in self.legal_moves_list
+        return move in self.between(move.from_square.index, move.to_square.index)
 
     def __repr__(self):
         return f"<LegalMoveGenerator at {id(self):#x}; list={self.legal_moves_list})>"
 
 class Board:
-    def __init__(self):
-        self.board: List[List[Piece]] = [[Piece(PieceType('_'), Color(0)) for _ in range(8)] for _ in range(8)]
+    def __init__(self, fen: Optional[str] = None):
+        self.bitboards: List[int] = [BB_EMPTY] * 12    # One mask per piece, indexed by color * 6 + piece type
+        self.occupied_co: List[int] = [BB_EMPTY, BB_EMPTY]     # All white pieces, all black pieces
+        self.occupied: int = BB_EMPTY
         self.turn: Color = Color.WHITE
-        self.castling_right: dict = {'K' : False, 'k' : False, 'Q' : False, 'q' : False}     # Castling rights for both players
+        self.castling_rights: int = BB_EMPTY     # Rook squares that still have castling rights
         self.fullmove_number: int = 1    # Increment by one after each black's turn
         self.halfmove_clock: int = 0     # Counter for 50-move draw rule
         self.ep_square: Square | None = None    # En passant
         self.move_stack: list = []
-        self._legal_moves: LegalMoveWrapper = LegalMoveWrapper(self)
-        self.reset()
+        self._stack: List[_BoardState] = []     # Undo records, parallel to move_stack
+        self._hash: int = 0     # Zobrist hash, kept up to date by every piece and state change
+        self._score: int = 0    # Packed material and placement score of the pieces, kept up to date like the hash
+        self._phase: int = 0    # Game phase of the pieces, see PHASE_WEIGHTS
+        self._init_caches()
+        if fen is None:
+            self.reset()
+        else:
+            self.set_fen(fen)
+
+    def _init_caches(self):
+        self._legal_moves_cache: OrderedDict[int, LegalMoveWrapper] = OrderedDict()
+        self._attack_maps: List[Optional[int]] = [None, None]   # Squares attacked by each side
+        self._attack_maps_hash: int = 0     # Zobrist hash of the position the attack maps belong to
+        self._status: Optional[_PositionStatus] = None
+        self._status_key: Optional[tuple] = None    # (hash, halfmove clock, last undo record) the status belongs to
 
+    @property
+    def board(self) -> List[List[Piece]]:
+        # Piece grid indexed by [rank][file], built from the bitboards
+        return [[self._piece(rank * 8 + file) for file in range(8)] for rank in range(8)]
+
+    @property
+    def castling_right(self) -> dict:
+        return {'K': bool(self.castling_rights & BB_H1), 'k': bool(self.castling_rights & BB_H8),
+                'Q': bool(self.castling_rights & BB_A1), 'q': bool(self.castling_rights & BB_A8)}
+
+    @castling_right.setter
+    def castling_right(self, rights: dict):
+        self.castling_rights = ((BB_H1 if rights.get('K') else BB_EMPTY) | (BB_H8 if rights.get('k') else BB_EMPTY) |
+                                (BB_A1 if rights.get('Q') else BB_EMPTY) | (BB_A8 if rights.get('q') else BB_EMPTY))
+        self._hash = self._compute_hash()
+
+    def zobrist_hash(self) -> int:
+        # 64-bit key of the position: pieces, side to move, castling rights and a capturable en passant square
+        return self._hash
+
+    def _compute_hash(self) -> int:
+        zobrist_hash = 0
+        for piece_index, bitboard in enumerate(self.bitboards):
+            for index in scan_forward(bitboard):
+                zobrist_hash ^= ZOBRIST_PIECES[piece_index][index]
+        if self.turn is Color.BLACK:
+            zobrist_hash ^= ZOBRIST_TURN
+        return zobrist_hash ^ castling_key(self.castling_rights) ^ self._ep_hash()
+
+    def _compute_evaluation(self) -> Tuple[int, int]:
+        # (packed score, phase) of the pieces on the board, from scratch
+        score = phase = 0
+        for piece_index, bitboard in enumerate(self.bitboards):
+            values = PIECE_SQUARE_SCORES[piece_index]
+            for index in scan_forward(bitboard):
+                score += values[index]
+                phase += PHASE_WEIGHTS[piece_index]
+        return score, phase
+
+    def _ep_hash(self) -> int:
+        # The en passant square only distinguishes positions if a pawn of the side to move can capture there
+        if self.ep_square is None:
+            return 0
+        ep_index = self.ep_square.index
+        us = WHITE if self.turn is Color.WHITE else BLACK
+        if PAWN_ATTACKS[us ^ 1][ep_index] & self.bitboards[us * 6 + PAWN]:
+            return ZOBRIST_EP_FILES[ep_index & 7]
+        return 0
 
     def __setitem__(self, square: Square | str, piece: Piece):
         if isinstance(square, str):
             square = Square(square)
-        self.board[square_rank_index(square)][square_file_index(square)] = piece
+        if piece.piece_type == PieceType.EMPTY:
+            self._remove_piece_at(square.index)
+        else:
+            color = WHITE if piece.color == Color.WHITE else BLACK
+            self._set_piece_at(square.index, color * 6 + PIECE_TYPE_INDICES[piece.piece_type])
 
     def __getitem__(self, square: Square | str) -> Piece:
         if isinstance(square, str):
             square = Square(square)
-        return self.board[square_rank_index(square)][square_file_index(square)]
+        return self._piece(square.index)
+
+    def piece_index_at(self, index: int) -> int:
+        # Index into self.bitboards of the piece on square index, or -1 if the square is empty
+        mask = BB_SQUARES[index]
+        if not self.occupied & mask:
+            return -1
+        bitboards = self.bitboards
+        start = 0 if self.occupied_co[WHITE] & mask else 6
+        for piece_index in range(start, start + 6):
+            if bitboards[piece_index] & mask:
+                return piece_index
+        return -1
+
+    def _piece(self, index: int) -> Piece:
+        piece_index = self.piece_index_at(index)
+        return PIECES[piece_index] if piece_index >= 0 else EMPTY_PIECE
+
+    def _remove_piece_at(self, index: int) -> int:
+        piece_index = self.piece_index_at(index)
+        if piece_index >= 0:
+            mask = BB_SQUARES[index]
+            self.bitboards[piece_index] ^= mask
+            self.occupied_co[piece_index // 6] ^= mask
+            self.occupied ^= mask
+            self._hash ^= ZOBRIST_PIECES[piece_index][index]
+            self._score -= PIECE_SQUARE_SCORES[piece_index][index]
+            self._phase -= PHASE_WEIGHTS[piece_index]
+        return piece_index
+
+    def _set_piece_at(self, index: int, piece_index: int):
+        self._remove_piece_at(index)
+        mask = BB_SQUARES[index]
+        self.bitboards[piece_index] |= mask
+        self.occupied_co[piece_index // 6] |= mask
+        self.occupied |= mask
+        self._hash ^= ZOBRIST_PIECES[piece_index][index]
+        self._score += PIECE_SQUARE_SCORES[piece_index][index]
+        self._phase += PHASE_WEIGHTS[piece_index]
 
     def reset(self):
-        for f in FILE_NAMES:
-            for r in RANK_NAMES:
-                self[f + r] = Piece.from_symbol('_')
-        for f in range(8):
-            self[chr(ord('a') + f) + '2'] = Piece.from_symbol('P')
-            self[chr(ord('a') + f) + '7'] = Piece.from_symbol('p')
-        self['a1'] = Piece.from_symbol('R')
-        self['h1'] = Piece.from_symbol('R')
-        self['a8'] = Piece.from_symbol('r')
-        self['h8'] = Piece.from_symbol('r')
-        self['b1'] = Piece.from_symbol('N')
-        self['g1'] = Piece.from_symbol('N')
-        self['b8'] = Piece.from_symbol('n')
-        self['g8'] = Piece.from_symbol('n')
-        self['c1'] = Piece.from_symbol('B')
-        self['f1'] = Piece.from_symbol('B')
-        self['c8'] = Piece.from_symbol('b')
-        self['f8'] = Piece.from_symbol('b')
-        self['d1'] = Piece.from_symbol('Q')
-        self['e1'] = Piece.from_symbol('K')
-        self['d8'] = Piece.from_symbol('q')
-        self['e8'] = Piece.from_symbol('k')
-
-        self.turn = Color.WHITE
-        self.castling_right = {'K' : True, 'k' : True, 'Q' : True, 'q' : True}     # Castling rights for both players
-        self.fullmove_number: int = 1    # Increment by one after each black's turn
-        self.halfmove_clock: int = 0     # Counter for 50-move draw rule
-        self.ep_square: Square | None = None    # En passant
-        self._legal_moves = LegalMoveWrapper(self)
-        self.move_stack: list = []
-
-    def can_castle_kingside(self) -> bool:
-        if not self.castling_right['K' if self.turn == Color.WHITE else 'k'] or self.is_in_check():
+        # Back to the starting position with an empty move stack
+        self.set_fen(STARTING_FEN)
+
+    def set_fen(self, fen: str):
+        parts = fen.split()
+        if len(parts) < 4:
+            raise InvalidFenError(f"Expected at least 4 fields in FEN: {fen!r}")
+        self._set_position(parts[0], parts[1], parts[2], parts[3],
+                           parts[4] if len(parts) > 4 else '0', parts[5] if len(parts) > 5 else '1', fen)
+
+    def set_epd(self, epd: str) -> Dict[str, str]:
+        # Set up the position from the four EPD fields and return the operations that follow them
+        parts = epd.split(maxsplit=4)
+        if len(parts) < 4:
+            raise InvalidFenError(f"Expected at least 4 fields in EPD: {epd!r}")
+        operations = {}
+        halfmove, fullmove = '0', '1'
+        if len(parts) > 4:
+            rest = parts[4].split(maxsplit=2)
+            if len(rest) >= 2 and rest[0].isdigit() and rest[1].rstrip(';').isdigit():
+                # A full FEN with move counters, possibly followed by operations
+                halfmove, fullmove = rest[0], rest[1].rstrip(';')
+                operations = parse_epd_operations(rest[2]) if len(rest) > 2 else {}
+            else:
+                operations = parse_epd_operations(parts[4])
+                halfmove, fullmove = operations.get('hmvc', halfmove), operations.get('fmvn', fullmove)
+        self._set_position(parts[0], parts[1], parts[2], parts[3], halfmove, fullmove, epd)
+        return operations
+
+    def _set_position(self, placement: str, turn: str, castling: str, ep: str, halfmove: str, fullmove: str,
+                      fen: str):
+        rows = placement.split('/')
+        if len(rows) != 8:
+            raise InvalidFenError(f"Expected 8 ranks in FEN: {fen!r}")
+        bitboards = [BB_EMPTY] * 12
+        zobrist_hash = 0
+        try:
+            for rank_start, row in zip(range(56, -8, -8), rows):
+                pieces, row_hash = _parse_fen_row(row, rank_start)
+                zobrist_hash ^= row_hash
+                for piece_index, mask in pieces:
+                    bitboards[piece_index] |= mask
+        except ValueError:
+            raise InvalidFenError(f"Invalid rank in FEN: {fen!r}")
+
+        if turn not in ('w', 'b'):
+            raise InvalidFenError(f"Invalid side to move in FEN: {fen!r}")
+        if castling != '-' and not set(castling) <= set('KQkq'):
+            raise InvalidFenError(f"Invalid castling rights in FEN: {fen!r}")
+        try:
+            ep_square = None if ep == '-' else Square(ep)
+            halfmove_clock = int(halfmove)
+            fullmove_number = int(fullmove)
+        except ValueError:
+            raise InvalidFenError(f"Invalid en passant square or move counters in FEN: {fen!r}")
+
+        self.bitboards = bitboards
+        self.occupied_co = [bitboards[0] | bitboards[1] | bitboards[2] | bitboards[3] | bitboards[4] | bitboards[5],
+                            bitboards[6] | bitboards[7] | bitboards[8] | bitboards[9] | bitboards[10] | bitboards[11]]
+        self.occupied = self.occupied_co[WHITE] | self.occupied_co[BLACK]
+        self.turn = Color.WHITE if turn == 'w' else Color.BLACK
+        self.castling_rights = ((BB_H1 if 'K' in castling else BB_EMPTY) | (BB_A1 if 'Q' in castling else BB_EMPTY) |
+                                (BB_H8 if 'k' in castling else BB_EMPTY) | (BB_A8 if 'q' in castling else BB_EMPTY))
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove_clock
+        self.fullmove_number = fullmove_number
+        if self.turn is Color.BLACK:
+            zobrist_hash ^= ZOBRIST_TURN
+        self._hash = zobrist_hash ^ castling_key(self.castling_rights) ^ self._ep_hash()
+        self._score, self._phase = self._compute_evaluation()
+        self.move_stack = []
+        self._stack = []
+
+    @classmethod
+    def from_fen(cls, fen: str) -> Self:
+        return cls(fen)
+
+    @classmethod
+    def from_epd(cls, epd: str) -> Tuple[Self, Dict[str, str]]:
+        # (board, operations) of an EPD line, parsed once: set_epd sets every position field, so the board is not
+        # first set up at the starting position
+        board = cls.__new__(cls)
+        board._init_caches()
+        operations = board.set_epd(epd)
+        return board, operations
+
+    def board_fen(self) -> str:
+        # Piece placement field of the FEN
+        symbols = [''] * 64
+        for piece_index, bitboard in enumerate(self.bitboards):
+            symbol = PIECE_SYMBOLS[piece_index]
+            for index in scan_forward(bitboard):
+                symbols[index] = symbol
+        rows = []
+        for rank_start in range(56, -8, -8):
+            row = ''
+            empty = 0
+            for symbol in symbols[rank_start:rank_start + 8]:
+                if symbol:
+                    if empty:
+                        row += str(empty)
+                        empty = 0
+                    row += symbol
+                else:
+                    empty += 1
+            rows.append(row + str(empty) if empty else row)
+        return '/'.join(rows)
+
+    def castling_fen(self) -> str:
+        rights = ''.join(right for right, mask in (('K', BB_H1), ('Q', BB_A1), ('k', BB_H8), ('q', BB_A8))
+                         if self.castling_rights & mask)
+        return rights or '-'
+
+    def epd(self, operations: Optional[Dict[str, str]] = None) -> str:
+        epd = (f"{self.board_fen()} {'w' if self.turn is Color.WHITE else 'b'} {self.castling_fen()} "
+               f"{self.ep_square.value if self.ep_square else '-'}")
+        if operations:
+            epd += ' ' + ' '.join(f'{opcode} "{operand}";' if (' ' in operand or ';' in operand) else f'{opcode} {operand};'
+                                  for opcode, operand in operations.items())
+        return epd
+
+    def fen(self) -> str:
+        return f"{self.epd()} {self.halfmove_clock} {self.fullmove_number}"
+
+    def copy(self, stack: bool = True) -> Self:
+        # Cheap copy of the position; the move stack is only copied if requested
+        board = Board.__new__(Board)
+        board.bitboards = self.bitboards.copy()
+        board.occupied_co = self.occupied_co.copy()
+        board.occupied = self.occupied
+        board.turn = self.turn
+        board.castling_rights = self.castling_rights
+        board.fullmove_number = self.fullmove_number
+        board.halfmove_clock = self.halfmove_clock
+        board.ep_square = self.ep_square
+        board.move_stack = self.move_stack.copy() if stack else []
+        board._stack = self._stack.copy() if stack else []
+        board._hash = self._hash
+        board._score = self._score
+        board._phase = self._phase
+        board._legal_moves_cache = OrderedDict()
+        board._attack_maps = self._attack_maps.copy()
+        board._attack_maps_hash = self._attack_maps_hash
+        board._status = None
+        board._status_key = None
+        return board
+
+    def _attackers_mask(self, color: int, index: int, occupied: int) -> int:
+        # Squares of pieces of the given color attacking square index, with occupied as blockers
+        bitboards = self.bitboards
+        base = color * 6
+        queens = bitboards[base + QUEEN]
+        return ((KNIGHT_ATTACKS[index] & bitboards[base + KNIGHT]) |
+                (KING_ATTACKS[index] & bitboards[base + KING]) |
+                (PAWN_ATTACKS[color ^ 1][index] & bitboards[base + PAWN]) |
+                (rook_attacks(index, occupied) & (bitboards[base + ROOK] | queens)) |
+                (bishop_attacks(index, occupied) & (bitboards[base + BISHOP] | queens)))
+
+    def attackers_of(self, square: Square, color: Color) -> List[Square]:
+        # Squares of the pieces of the given color that attack square
+        mask = self._attackers_mask(WHITE if color is Color.WHITE else BLACK, square.index, self.occupied)
+        return [SQUARES[index] for index in scan_forward(mask)]
+
+    def _attack_map(self, color: int) -> int:
+        # All squares attacked by one side, computed once per position
+        if self._attack_maps_hash != self._hash:
+            self._attack_maps = [None, None]
+            self._attack_maps_hash = self._hash
+        attacks = self._attack_maps[color]
+        if attacks is None:
+            attacks = self._attack_maps[color] = self._compute_attack_map(color)
+        return attacks
+
+    def _compute_attack_map(self, color: int) -> int:
+        bitboards = self.bitboards
+        base = color * 6
+        occupied = self.occupied
+        pawns = bitboards[base + PAWN]
+        if color == WHITE:
+            attacks = ((pawns << 9) & ~BB_FILE_A | (pawns << 7) & ~BB_FILE_H) & BB_ALL
+        else:
+            attacks = (pawns >> 7) & ~BB_FILE_A | (pawns >> 9) & ~BB_FILE_H
+        for index in scan_forward(bitboards[base + KNIGHT]):
+            attacks |= KNIGHT_ATTACKS[index]
+        for index in scan_forward(bitboards[base + BISHOP] | bitboards[base + QUEEN]):
+            attacks |= bishop_attacks(index, occupied)
+        for index in scan_forward(bitboards[base + ROOK] | bitboards[base + QUEEN]):
+            attacks |= rook_attacks(index, occupied)
+        for index in scan_forward(bitboards[base + KING]):
+            attacks |= KING_ATTACKS[index]
+        return attacks
+
+    def _castling_path_clear(self, us: int, rook_mask: int, empty_mask: int, safe_mask: int) -> bool:
+        base = us * 6
+        king_mask = BB_E1 if us == WHITE else BB_E8
+        if not (self.castling_rights & rook_mask and self.bitboards[base + ROOK] & rook_mask
+                and self.bitboards[base + KING] & king_mask):
             return False
-
-        for file_index in range(5, 7):
-            square = get_square(0 if self.turn == Color.WHITE else 7, file_index)
-            if (not self.is_empty_square(square)) or self.is_under_attack(square):
-                return False
-
-        return (self.is_empty_square(Square.G1)) if self.turn == Color.WHITE \
-            else (self.is_empty_square(Square.G8))
-
-    def can_castle_queenside(self) -> bool:
-        if not self.castling_right['Q' if self.turn == Color.WHITE else 'q'] or self.is_in_check():
+        if self.occupied & empty_mask:
             return False
+        # The king may not castle out of, through or into check
+        return not self._attack_map(us ^ 1) & safe_mask
 
-        # Check if the squares on the way are not under attack
-        for file_index in range(2, 4):
-            square = get_square(0 if self.turn == Color.WHITE else 7, file_index)
-            if (not self.is_empty_square(square)) or self.is_under_attack(square):
-                return False
+    def can_castle_kingside(self) -> bool:
+        if self.turn is Color.WHITE:
+            return self._castling_path_clear(WHITE, BB_H1, BB_F1 | BB_G1, BB_E1 | BB_F1 | BB_G1)
+        return self._castling_path_clear(BLACK, BB_H8, BB_F8 | BB_G8, BB_E8 | BB_F8 | BB_G8)
 
-        return (self.is_empty_square(Square.B1) and self.is_empty_square(Square.C1)) \
-                if self.turn == Color.WHITE else (self.is_empty_square(Square.B8) and self.is_empty_square(Square.C8))
+    def can_castle_queenside(self) -> bool:
+        if self.turn is Color.WHITE:
+            return self._castling_path_clear(WHITE, BB_A1, BB_B1 | BB_C1 | BB_D1, BB_C1 | BB_D1 | BB_E1)
+        return self._castling_path_clear(BLACK, BB_A8, BB_B8 | BB_C8 | BB_D8, BB_C8 | BB_D8 | BB_E8)
 
     @property
     def legal_moves(self) -> LegalMoveWrapper:
         # Wrapper for generate_legal_moves and is_legal
-        # Since legal_moves need to be reset after each turn
-        if self._legal_moves.board.fullmove_number != self.fullmove_number or self._legal_moves.board.turn != self.turn:
-            # Generate new set of legal moves
-            # print("Recalculating legal moves")
-            self._legal_moves = LegalMoveWrapper(self)
-        return self._legal_moves
+        # Move lists are cached by Zobrist hash, so revisited positions (undo, analysis) reuse them
+        cache = self._legal_moves_cache
+        legal_moves = cache.get(self._hash)
+        if legal_moves is None:
+            legal_moves = cache[self._hash] = LegalMoveWrapper(self)
+            if len(cache) > LEGAL_MOVE_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(self._hash)
+        return legal_moves
+
+    def generate_pseudo_legal_moves(self) -> List[Move]:
+        # All moves of the side to move, ignoring whether they leave the own king in check
+        us = WHITE if self.turn is Color.WHITE else BLACK
+        bitboards = self.bitboards
+        base = us * 6
+        not_own = ~self.occupied_co[us]
+        occupied = self.occupied
+        queens = bitboards[base + QUEEN]
+        moves_list = []
+
+        for from_index in scan_forward(bitboards[base + KNIGHT]):
+            self._append_moves(from_index, KNIGHT_ATTACKS[from_index] & not_own, moves_list)
+        for from_index in scan_forward(bitboards[base + BISHOP] | queens):
+            self._append_moves(from_index, bishop_attacks(from_index, occupied) & not_own, moves_list)
+        for from_index in scan_forward(bitboards[base + ROOK] | queens):
+            self._append_moves(from_index, rook_attacks(from_index, occupied) & not_own, moves_list)
+        for from_index in scan_forward(bitboards[base + KING]):
+            self._append_moves(from_index, KING_ATTACKS[from_index] & not_own, moves_list)
+            self._append_castling_moves(from_index, moves_list)
+        self._append_pawn_moves(us, bitboards[base + PAWN], moves_list)
+        return moves_list
 
     def generate_legal_moves(self) -> List[Move]:
-        moves_list = []
-        for sq in Square:
-            if self[sq].color == self.turn:
-                if self[sq].piece_type == PieceType.ROOK:
-                    moves_list.extend(self.generate_rook_moves(sq))
-                if self[sq].piece_type == PieceType.KNIGHT:
-                    moves_list.extend(self.generate_knight_moves(sq))
-                if self[sq].piece_type == PieceType.BISHOP:
-                    moves_list.extend(self.generate_bishop_moves(sq))
-                if self[sq].piece_type == PieceType.QUEEN:
-                    moves_list.extend(self.generate_queen_moves(sq))
-                if self[sq].piece_type == PieceType.KING:
-                    moves_list.extend(self.generate_king_moves(sq))
-                if self[sq].piece_type == PieceType.PAWN:
-                    moves_list.extend(self.generate_pawn_moves(sq))
+        # Only legal moves are produced: checkers and pins are computed once, no move is tried on the board
+        context = self._legal_context()
+        if context is None:
+            return self.generate_pseudo_legal_moves()
         legal_moves_list = []
-        for move in moves_list:
-            temp_board = deepcopy(self)
-            temp_board.perform_move(move)
-            temp_board.turn = Color(-temp_board.turn.value)
-            if not temp_board.is_in_check():
-                legal_moves_list.append(move)
+        self._append_legal_moves(legal_moves_list, context, BB_ALL, BB_ALL)
         return legal_moves_list
 
+    def generate_legal_moves_staged(self) -> Iterator[Move]:
+        # Lazily yield the legal moves in stages: captures (with en passant and capturing promotions),
+        # quiet promotions, then quiet moves and castling. Later stages are never generated if the caller stops
+        # early. The board must not be changed while iterating.
+        context = self._legal_context()
+        if context is None:
+            yield from self.generate_pseudo_legal_moves()
+            return
+        them = self.occupied_co[context[0] ^ 1]
+        empty = ~self.occupied & BB_ALL
+        for targets, pawn_targets, castling, en_passant in ((them, them, False, True),
+                                                             (BB_EMPTY, empty & BB_BACKRANKS, False, False),
+                                                             (empty, empty & ~BB_BACKRANKS, True, False)):
+            stage = []
+            self._append_legal_moves(stage, context, targets, pawn_targets, castling, en_passant)
+            yield from stage
+
+    def generate_captures(self) -> List[Move]:
+        # Legal captures (en passant included) and promotions, most valuable victim first (see mvv_lva)
+        context = self._legal_context()
+        if context is None:
+            moves = [move for move in self.generate_pseudo_legal_moves()
+                     if move.promotion is not None or self.is_capture(move)]
+        else:
+            them = self.occupied_co[context[0] ^ 1]
+            moves = []
+            self._append_legal_moves(moves, context, them, them | (~self.occupied & BB_BACKRANKS), castling=False)
+        moves.sort(key=self.mvv_lva, reverse=True)
+        return moves
+
+    def generate_checks(self) -> List[Move]:
+        # Legal quiet moves that give check, directly or by uncovering a slider. Captures and promotions are left
+        # to generate_captures, so the two lists never overlap.
+        context = self._legal_context()
+        us = WHITE if self.turn is Color.WHITE else BLACK
+        king_mask = self.bitboards[(us ^ 1) * 6 + KING]
+        if context is None or not king_mask:
+            return [move for move in self.generate_pseudo_legal_moves()
+                    if move.promotion is None and not self.is_capture(move) and self._gives_check_slow(move)]
+        bitboards = self.bitboards
+        base = us * 6
+        king = msb(king_mask)
+        empty = ~self.occupied & BB_ALL
+        pawn_empty = empty & ~BB_BACKRANKS
+        # Squares each piece type checks the enemy king from
+        bishop_checks = bishop_attacks(king, self.occupied)
+        rook_checks = rook_attacks(king, self.occupied)
+        checks = [PAWN_ATTACKS[us ^ 1][king], KNIGHT_ATTACKS[king], bishop_checks, rook_checks,
+                  bishop_checks | rook_checks, BB_EMPTY]
+        discoverers = self._blockers_mask(king, us) & self.occupied_co[us]
+
+        moves = []
+        for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN):
+            self._append_legal_moves(moves, context, checks[piece_type] & empty, BB_EMPTY, castling=False,
+                                     en_passant=False, from_mask=bitboards[base + piece_type] & ~discoverers)
+        self._append_legal_moves(moves, context, BB_EMPTY, checks[PAWN] & pawn_empty, castling=False,
+                                 en_passant=False, from_mask=bitboards[base + PAWN] & ~discoverers)
+        for from_index in scan_forward(discoverers):
+            # Leaving the line to the enemy king uncovers the slider behind; staying on it may still check directly
+            piece_type = self.piece_index_at(from_index) % 6
+            targets = (~BB_RAYS[king][from_index] | checks[piece_type]) & empty
+            self._append_legal_moves(moves, context, targets, targets & pawn_empty, castling=False,
+                                     en_passant=False, from_mask=BB_SQUARES[from_index])
+        if not context[2]:
+            castling = []
+            self._append_castling_moves(context[1], castling)
+            moves.extend(move for move in castling if self._gives_check_slow(move))
+        return moves
+
+    def _gives_check_slow(self, move: Move) -> bool:
+        # Play the move to see whether it checks; only used for the moves the bitboard tests do not cover
+        self.perform_move(move)
+        try:
+            return self.is_in_check()
+        finally:
+            self.pop()
+
+    def any_legal_move(self) -> bool:
+        # True as soon as one legal move is found
+        legal_moves = self._legal_moves_cache.get(self._hash)
+        if legal_moves is not None:
+            return len(legal_moves) > 0
+        for _ in self.generate_legal_moves_staged():
+            return True
+        return False
+
+    def _legal_context(self) -> Optional[tuple]:
+        # (us, king square, checkers, pinned pieces, squares that resolve a single check), or None without a king
+        us = WHITE if self.turn is Color.WHITE else BLACK
+        king_mask = self.bitboards[us * 6 + KING]
+        if not king_mask:
+            return None
+        king = msb(king_mask)
+        checkers = self._attackers_mask(us ^ 1, king, self.occupied)
+        if not checkers:
+            evasions = BB_ALL
+        elif checkers & (checkers - 1):
+            # Double check: only the king can move
+            evasions = BB_EMPTY
+        else:
+            # Other pieces must capture the checker or block the line to it
+            evasions = BB_BETWEEN[king][lsb(checkers)] | checkers
+        return us, king, checkers, self._pinned_mask(us, king), evasions
+
+    def _append_legal_moves(self, moves_list: List[Move], context: tuple, targets: int, pawn_targets: int,
+                            castling: bool = True, en_passant: bool = True, from_mask: int = BB_ALL):
+        # Legal moves of the pieces on from_mask onto targets (pawn_targets for pawns)
+        us, king, checkers, pinned, evasions = context
+        them = us ^ 1
+        bitboards = self.bitboards
+        base = us * 6
+        occupied = self.occupied
+        not_own = ~self.occupied_co[us]
+
+        if BB_SQUARES[king] & from_mask:
+            # The king may not step onto an attacked square; it no longer blocks sliders behind it
+            king_mask = BB_SQUARES[king]
+            king_moves = MOVES[king]
+            for to_index in scan_forward(KING_ATTACKS[king] & not_own & targets):
+                if not self._attackers_mask(them, to_index, occupied ^ king_mask):
+                    moves_list.append(king_moves[to_index])
+            if castling and not checkers:
+                self._append_castling_moves(king, moves_list)
+        if not evasions:
+            return
+
+        target_mask = not_own & targets & evasions
+        queens = bitboards[base + QUEEN]
+        for from_index in scan_forward(bitboards[base + KNIGHT] & ~pinned & from_mask):
+            self._append_moves(from_index, KNIGHT_ATTACKS[from_index] & target_mask, moves_list)
+        for from_index in scan_forward((bitboards[base + BISHOP] | queens) & from_mask):
+            bishop_targets = bishop_attacks(from_index, occupied) & target_mask
+            if BB_SQUARES[from_index] & pinned:
+                # A pinned piece may only move along the line through the king
+                bishop_targets &= BB_RAYS[king][from_index]
+            self._append_moves(from_index, bishop_targets, moves_list)
+        for from_index in scan_forward((bitboards[base + ROOK] | queens) & from_mask):
+            rook_targets = rook_attacks(from_index, occupied) & target_mask
+            if BB_SQUARES[from_index] & pinned:
+                rook_targets &= BB_RAYS[king][from_index]
+            self._append_moves(from_index, rook_targets, moves_list)
+
+        pawns = bitboards[base + PAWN] & from_mask
+        pawn_target_mask = pawn_targets & evasions
+        self._append_pawn_moves(us, pawns & ~pinned, moves_list, pawn_target_mask, en_passant=False)
+        for from_index in scan_forward(pawns & pinned):
+            self._append_pawn_moves(us, BB_SQUARES[from_index], moves_list, pawn_target_mask & BB_RAYS[king][from_index],
+                                    en_passant=False)
+        if en_passant:
+            self._append_legal_en_passant(us, king, pawns, moves_list)
+
+    def _pinned_mask(self, color: int, king: int) -> int:
+        # Pieces of color that are the only piece between their king and an enemy slider
+        return self._blockers_mask(king, color ^ 1) & self.occupied_co[color]
+
+    def _blockers_mask(self, king: int, sniper_color: int) -> int:
+        # Pieces of either color that are the only piece between square king and a slider of sniper_color
+        bitboards = self.bitboards
+        base = sniper_color * 6
+        queens = bitboards[base + QUEEN]
+        snipers = ((rook_attacks(king, BB_EMPTY) & (bitboards[base + ROOK] | queens)) |
+                   (bishop_attacks(king, BB_EMPTY) & (bitboards[base + BISHOP] | queens)))
+        blocking = BB_EMPTY
+        for sniper in scan_forward(snipers):
+            blockers = BB_BETWEEN[king][sniper] & self.occupied
+            if blockers and not blockers & (blockers - 1):
+                blocking |= blockers
+        return blocking
+
+    def _append_legal_en_passant(self, us: int, king: int, pawns: int, moves_list: List[Move]):
+        if self.ep_square is None:
+            return
+        ep_index = self.ep_square.index
+        if not BB_SQUARES[ep_index] & (BB_RANK_6 if us == WHITE else BB_RANK_3) & ~self.occupied:
+            return
+        captured_index = ep_index - 8 if us == WHITE else ep_index + 8
+        for from_index in scan_forward(PAWN_ATTACKS[us ^ 1][ep_index] & pawns):
+            # Two pawns leave the capturing rank at once, which can uncover a slider on the king;
+            # test the king against the occupancy after the capture instead of pins and check masks
+            occupied = (self.occupied ^ BB_SQUARES[from_index] ^ BB_SQUARES[captured_index]) | BB_SQUARES[ep_index]
+            if not self._attackers_mask(us ^ 1, king, occupied) & ~BB_SQUARES[captured_index]:
+                moves_list.append(MOVES[from_index][ep_index])
+
     def perform_move(self, move: Move):
-        if self[move.from_square].piece_type == PieceType.KING and abs(square_file_index(move.from_square) - square_file_index(move.to_square)) == 2:
+        from_index = move.from_square.index
+        to_index = move.to_square.index
+        us = WHITE if self.turn is Color.WHITE else BLACK
+        ep_square = self.ep_square
+        state = _BoardState(-1, -1, to_index, self.castling_rights, ep_square, self.halfmove_clock, self._hash)
+        # Take the old en passant and castling keys out; piece keys are updated as pieces move
+        self._hash ^= self._ep_hash() ^ castling_key(self.castling_rights)
+
+        piece_index = state.piece_index = self._remove_piece_at(from_index)
+        captured_index = state.captured_index = self._remove_piece_at(to_index)
+        piece_type = piece_index % 6 if piece_index >= 0 else -1
+
+        self.ep_square = None
+        if piece_type == PAWN:
+            if abs(to_index - from_index) == 16:
+                # If a pawn move is advancing 2 squares, update en passant square
+                self.ep_square = SQUARES[(from_index + to_index) // 2]
+            elif move.to_square == ep_square and captured_index < 0:
+                # En passant capture removes the pawn behind the target square
+                state.captured_square = to_index - 8 if us == WHITE else to_index + 8
+                captured_index = state.captured_index = self._remove_piece_at(state.captured_square)
+            if move.promotion:
+                piece_index = us * 6 + PIECE_TYPE_INDICES[move.promotion]
+        elif piece_type == KING and abs(square_file(to_index) - square_file(from_index)) == 2:
             # This is a castling move
-            if square_file_index(move.to_square) > square_file_index(move.from_square):
+            if to_index > from_index:
                 # Kingside castling
-                rook_from_square = get_square(square_rank_index(move.from_square), square_file_index(Square.H1))
-                rook_to_square = get_square(square_rank_index(move.from_square), square_file_index(Square.F1))
+                rook_from_index, rook_to_index = from_index + 3, from_index + 1
             else:
                 # Queenside castling
-                rook_from_square = get_square(square_rank_index(move.from_square), square_file_index(Square.A1))
-                rook_to_square = get_square(square_rank_index(move.from_square), square_file_index(Square.D1))
+                rook_from_index, rook_to_index = from_index - 4, from_index - 1
+            # Move the rook
+            self._set_piece_at(rook_to_index, self._remove_piece_at(rook_from_index))
 
-                # Move the rook
-            self[rook_to_square] = self[rook_from_square]
-            self[rook_from_square] = Piece.from_symbol('_')
+        if piece_index >= 0:
+            self._set_piece_at(to_index, piece_index)
 
-        self[move.to_square] = self[move.from_square]
-        self[move.from_square] = Piece.from_symbol('_')
+        if piece_type == PAWN or captured_index >= 0:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+
+        # Moving a king or a rook, or capturing a rook, loses the corresponding castling rights
+        self.castling_rights &= ~(BB_SQUARES[from_index] | BB_SQUARES[to_index])
+        if piece_type == KING:
+            self.castling_rights &= ~(BB_RANK_1 if us == WHITE else BB_RANK_8)
 
         self.turn = Color(-self.turn.value)
         if self.turn == Color.WHITE:
             self.fullmove_number += 1
-
-        if self[move.to_square].piece_type == PieceType.PAWN:
-            self.halfmove_clock = 0
-            if abs(square_rank_index(move.to_square) - square_rank_index(move.from_square)) == 2:
-                # If a pawn move is advancing 2 squares, update en passant square
-                if self[move.to_square].color == Color.WHITE:
-                    self.ep_square = Square(move.to_square.value[0] + '3')
-                else:
-                    self.ep_square = Square(move.to_square.value[0] + '6')
-            elif move.promotion:
-                self[move.to_square] = Piece(move.promotion, Color(-self.turn.value))
-            else:
-                if move.to_square == self.ep_square:
-                    ep_rank = square_rank_index(self.ep_square)
-                    ep_file = square_file_index(self.ep_square)
-                    self[get_square(ep_rank + self.turn.value, ep_file)] = Piece.from_symbol('_')
-                self.ep_square = None
-        else:
-            self.halfmove_clock += 1
-            self.ep_square = None
-
-        if move.from_square == Square.A1:
-            self.castling_right['Q'] = False
-        if move.from_square == Square.H1:
-            self.castling_right['K'] = False
-        if move.from_square == Square.A8:
-            self.castling_right['q'] = False
-        if move.from_square == Square.H8:
-            self.castling_right['k'] = False
-        if move.from_square == Square.E1:
-            self.castling_right['K'] = False
-            self.castling_right['Q'] = False
-        if move.from_square == Square.E8:
-            self.castling_right['k'] = False
-            self.castling_right['q'] = False
+        self._hash ^= ZOBRIST_TURN ^ castling_key(self.castling_rights) ^ self._ep_hash()
 
         self.move_stack.append(move)
+        self._stack.append(state)
+        self._status = None
+
+    def pop(self) -> Move:
+        # Take back the last move in O(1) from its undo record
+        move = self.move_stack.pop()
+        state = self._stack.pop()
+        from_index = move.from_square.index
+        to_index = move.to_square.index
+
+        self._remove_piece_at(to_index)
+        if state.piece_index >= 0:
+            self._set_piece_at(from_index, state.piece_index)
+            if state.piece_index % 6 == KING and abs(square_file(to_index) - square_file(from_index)) == 2:
+                # Put the castled rook back in its corner
+                if to_index > from_index:
+                    self._set_piece_at(from_index + 3, self._remove_piece_at(from_index + 1))
+                else:
+                    self._set_piece_at(from_index - 4, self._remove_piece_at(from_index - 1))
+        if state.captured_index >= 0:
+            self._set_piece_at(state.captured_square, state.captured_index)
+
+        self.castling_rights = state.castling_rights
+        self.ep_square = state.ep_square
+        self.halfmove_clock = state.halfmove_clock
+        self._hash = state.zobrist_hash
+        self._status = None
+        if self.turn == Color.WHITE:
+            self.fullmove_number -= 1
+        self.turn = Color(-self.turn.value)
+        return move
 
     def is_empty_square(self, square: Square) -> bool:
         # Check if the square is empty
-        return self[square].piece_type == PieceType.EMPTY
-
-    def generate_rook_moves(self, square: Square) -> List[Move]:
-        rook_moves = []
-        rank = square_rank_index(square)
-        file = square_file_index(square)
-
-        # Iterate in four directions: up, down, left, right
-        directions = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+        return not self.occupied & BB_SQUARES[square.index]
 
-        for delta_rank, delta_file in directions:
-            target_rank, target_file = rank + delta_rank, file + delta_file
+    def _append_moves(self, from_index: int, targets: int, moves_list: List[Move]):
+        moves_from = MOVES[from_index]
+        for to_index in scan_forward(targets):
+            moves_list.append(moves_from[to_index])
 
-            while is_valid_square(target_rank, target_file):
-                target_square = get_square(target_rank, target_file)
+    def _append_castling_moves(self, king_index: int, moves_list: List[Move]):
+        if not self.occupied_co[WHITE if self.turn is Color.WHITE else BLACK] & BB_SQUARES[king_index]:
+            return
+        if self.can_castle_kingside():
+            moves_list.append(MOVES[king_index][king_index + 2])
+        if self.can_castle_queenside():
+            moves_list.append(MOVES[king_index][king_index - 2])
+
+    def _append_pawn_moves(self, color: int, pawns: int, moves_list: List[Move], target_mask: int = BB_ALL,
+                           en_passant: bool = True):
+        # Only moves onto target_mask are added; en passant is left to the caller if en_passant is False
+        occupied = self.occupied
+        them = self.occupied_co[color ^ 1] & target_mask
+        if color == WHITE:
+            forward = 8
+            single_pushes = (pawns << 8) & ~occupied & BB_ALL
+            double_pushes = ((single_pushes & BB_RANK_3) << 8) & ~occupied
+            ep_rank = BB_RANK_6
+        else:
+            forward = -8
+            single_pushes = (pawns >> 8) & ~occupied
+            double_pushes = ((single_pushes & BB_RANK_6) >> 8) & ~occupied
+            ep_rank = BB_RANK_3
+        double_pushes &= target_mask
+        single_pushes &= target_mask
 
-                if self.is_empty_square(target_square) or self[square].color != self[target_square].color:
-                    rook_moves.append(Move(square, target_square))
-                if not self.is_empty_square(target_square):
-                    break
+        # Pawn captures diagonally
+        for from_index in scan_forward(pawns):
+            for to_index in scan_forward(PAWN_ATTACKS[color][from_index] & them):
+                self._append_pawn_move(from_index, to_index, moves_list)
+
+        # Pawn single and double moves
+        for to_index in scan_forward(single_pushes):
+            self._append_pawn_move(to_index - forward, to_index, moves_list)
+        for to_index in scan_forward(double_pushes):
+            moves_list.append(MOVES[to_index - 2 * forward][to_index])
+
+        if en_passant and self.ep_square is not None:
+            ep_index = self.ep_square.index
+            if BB_SQUARES[ep_index] & ep_rank & ~occupied:
+                for from_index in scan_forward(PAWN_ATTACKS[color ^ 1][ep_index] & pawns):
+                    moves_list.append(MOVES[from_index][ep_index])
+
+    def _append_pawn_move(self, from_index: int, to_index: int, moves_list: List[Move]):
+        if BB_SQUARES[to_index] & BB_BACKRANKS:
+            # Add promotion moves for each possible promoted piece
+            moves_list.extend(PROMOTION_MOVES[from_index][to_index])
+        else:
+            moves_list.append(MOVES[from_index][to_index])
 
-                target_rank += delta_rank
-                target_file += delta_file
+    def _own_pieces(self, index: int) -> int:
+        # Pieces of the same color as the piece on square index (the side to move if it is empty)
+        if self.occupied_co[BLACK] & BB_SQUARES[index]:
+            return self.occupied_co[BLACK]
+        if self.occupied_co[WHITE] & BB_SQUARES[index]:
+            return self.occupied_co[WHITE]
+        return self.occupied_co[WHITE if self.turn is Color.WHITE else BLACK]
 
+    def generate_rook_moves(self, square: Square) -> List[Move]:
+        index = square.index
+        rook_moves = []
+        self._append_moves(index, rook_attacks(index, self.occupied) & ~self._own_pieces(index), rook_moves)
         return rook_moves
 
     def generate_knight_moves(self, square: Square) -> List[Move]:
+        index = square.index
         knight_moves = []
-
-        # Extract rank and file indices from the given square
-        rank = square_rank_index(square)
-        file = square_file_index(square)
-
-        # Iterate over all possible knight moves
-        knight_move_offsets = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
-        for offset_rank, offset_file in knight_move_offsets:
-            target_rank = rank + offset_rank
-            target_file = file + offset_file
-
-            if is_valid_square(target_rank, target_file):
-                target_square = get_square(target_rank, target_file)
-                if self[square].color != self[target_square].color or self.is_empty_square(target_square):
-                    knight_moves.append(Move(square, target_square))
-
+        self._append_moves(index, KNIGHT_ATTACKS[index] & ~self._own_pieces(index), knight_moves)
         return knight_moves
 
     def generate_bishop_moves(self, square: Square) -> List[Move]:
+        index = square.index
         bishop_moves = []
-        # Extract rank and file indices from the given square
-        rank = square_rank_index(square)
-        file = square_file_index(square)
-
-        # Iterate diagonally outward from the current square
-        directions = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
-
-        for delta_rank, delta_file in directions:
-            target_rank, target_file = rank + delta_rank, file + delta_file
-
-            while is_valid_square(target_rank, target_file):
-                target_square = get_square(target_rank, target_file)
-
-                if self.is_empty_square(target_square) or self[square].color != self[target_square].color:
-                    bishop_moves.append(Move(square, target_square))
-                if not self.is_empty_square(target_square):
-                    break
-
-                target_rank += delta_rank
-                target_file += delta_file
-
+        self._append_moves(index, bishop_attacks(index, self.occupied) & ~self._own_pieces(index), bishop_moves)
         return bishop_moves
 
     def generate_queen_moves(self, square: Square) -> List[Move]:
@@ -288,198 +905,309 @@ class Board:
         return queen_moves
 
     def generate_king_moves(self, square: Square) -> List[Move]:
+        index = square.index
         king_moves = []
-        # Extract rank and file indices from the given square
-        rank = square_rank_index(square)
-        file = square_file_index(square)
-        # Iterate over all adjacent squares
-        for delta_rank in range(-1, 2):
-            for delta_file in range(-1, 2):
-                target_rank, target_file = rank + delta_rank, file + delta_file
-
-                # Skip the current square
-                if delta_rank == 0 and delta_file == 0:
-                    continue
-
-                if is_valid_square(target_rank, target_file):
-                    target_square = get_square(target_rank, target_file)
-
-                    if not self[square].color == self[target_square].color or self.is_empty_square(target_square):
-                        king_moves.append(Move(square, target_square))
-
-        if self.can_castle_kingside():
-            kingside_square = get_square(rank, file + 2)
-            king_moves.append(Move(square, kingside_square))
-
-        if self.can_castle_queenside():
-            queenside_square = get_square(rank, file - 2)
-            king_moves.append(Move(square, queenside_square))
-
+        self._append_moves(index, KING_ATTACKS[index] & ~self._own_pieces(index), king_moves)
+        self._append_castling_moves(index, king_moves)
         return king_moves
 
     def generate_pawn_moves(self, square: Square) -> List[Move]:
+        index = square.index
+        color = BLACK if self.occupied_co[BLACK] & BB_SQUARES[index] else WHITE
         pawn_moves = []
-
-        # Extract rank and file indices from the given square
-        rank = square_rank_index(square)
-        file = square_file_index(square)
-
-        # Determine the direction of pawn movement based on color
-        direction = 1 if self.turn == Color.WHITE else -1
-
-        # Pawn single move
-        target_rank = rank + direction
-        target_file = file
-
-        if is_valid_square(target_rank, target_file) and self.is_empty_square(get_square(target_rank, target_file)):
-
-            if (self.turn == Color.WHITE and rank == 6) or (self.turn == Color.BLACK and rank == 1):
-                # Add promotion moves for each possible promoted piece
-                for piece_type in [PieceType.QUEEN, PieceType.ROOK, PieceType.BISHOP, PieceType.KNIGHT]:
-                    pawn_moves.append(Move(square, get_square(target_rank, target_file), promotion=piece_type))
-            else:
-                pawn_moves.append(Move(square, get_square(target_rank, target_file)))
-
-        # Pawn double move from starting rank
-        if (
-                ((self.turn == Color.WHITE and rank == 1) or (self.turn == Color.BLACK and rank == 6))
-                and self.is_empty_square(get_square(target_rank, target_file))
-                and self.is_empty_square(get_square(target_rank + direction, target_file))
-        ):
-            pawn_moves.append(Move(square, get_square(target_rank + direction, target_file)))
-
-        # Pawn captures diagonally
-        capture_offsets = [(direction, -1), (direction, 1)]
-        for offset_rank, offset_file in capture_offsets:
-            target_rank = rank + offset_rank
-            target_file = file + offset_file
-            if is_valid_square(target_rank, target_file) and get_square(target_rank, target_file) == self.ep_square:
-                pawn_moves.append(Move(square, get_square(target_rank, target_file)))
-            if (is_valid_square(target_rank, target_file) and not self.is_empty_square(get_square(target_rank, target_file)) and \
-                    not self[square].color == self[get_square(target_rank, target_file)].color):
-                if (self.turn == Color.WHITE and rank == 6) or (self.turn == Color.BLACK and rank == 1):
-                    # Add promotion moves for each possible promoted piece
-                    for piece_type in [PieceType.QUEEN, PieceType.ROOK, PieceType.BISHOP, PieceType.KNIGHT]:
-                        pawn_moves.append(Move(square, get_square(target_rank, target_file), promotion=piece_type))
-                else:
-                    pawn_moves.append(Move(square, get_square(target_rank, target_file)))
-
+        self._append_pawn_moves(color, BB_SQUARES[index], pawn_moves)
         return pawn_moves
 
     def is_under_attack(self, square: Square) -> bool:
         # Check if the square is under attack by the opponent
-        opponent_color = Color.WHITE if self.turn == Color.BLACK else Color.BLACK
-
-        # Iterate over all opponent's pieces and check if they can attack the square
-        for from_rank in range(8):
-            for from_file in range(8):
-                piece = self.board[from_rank][from_file]
-
-                # Skip empty squares or squares with the same-color pieces
-                if piece.piece_type == PieceType.EMPTY or piece.color == self.turn:
-                    continue
-
-                # Check if the opponent's piece can attack the target square
-                if piece.piece_type == PieceType.PAWN:
-                    # Pawn attacks
-                    direction = 1 if piece.color == Color.WHITE else -1
-                    capture_offsets = [(direction, -1), (direction, 1)]
-                    for offset_rank, offset_file in capture_offsets:
-                        target_rank = from_rank + offset_rank
-                        target_file = from_file + offset_file
-                        if is_valid_square(target_rank, target_file) and square == get_square(target_rank, target_file):
-                            return True
-
-                elif piece.piece_type == PieceType.KNIGHT:
-                    # Knight attacks
-                    knight_move_offsets = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
-                    for offset_rank, offset_file in knight_move_offsets:
-                        target_rank = from_rank + offset_rank
-                        target_file = from_file + offset_file
-                        if is_valid_square(target_rank, target_file) and square == get_square(target_rank, target_file):
-                            return True
-
-                elif piece.piece_type == PieceType.BISHOP:
-                    # Bishop attacks
-                    for offset_rank, offset_file in zip([-1, -1, 1, 1], [-1, 1, -1, 1]):
-                        target_rank, target_file = from_rank + offset_rank, from_file + offset_file
-                        while is_valid_square(target_rank, target_file):
-                            if square == get_square(target_rank, target_file):
-                                return True
-                            if not self.is_empty_square(get_square(target_rank, target_file)):
-                                break
-                            target_rank += offset_rank
-                            target_file += offset_file
-
-                elif piece.piece_type == PieceType.ROOK:
-                    # Rook attacks
-                    for offset_rank, offset_file in zip([-1, 0, 1, 0], [0, 1, 0, -1]):
-                        target_rank, target_file = from_rank + offset_rank, from_file + offset_file
-                        while is_valid_square(target_rank, target_file):
-                            if square == get_square(target_rank, target_file):
-                                return True
-                            if not self.is_empty_square(get_square(target_rank, target_file)):
-                                break
-                            target_rank += offset_rank
-                            target_file += offset_file
-
-                elif piece.piece_type == PieceType.QUEEN:
-                    # Queen attacks (combination of rook and bishop)
-                    for offset_rank, offset_file in zip([-1, -1, 1, 1, -1, 0, 1, 0], [-1, 1, -1, 1, 0, 1, 0, -1]):
-                        target_rank, target_file = from_rank + offset_rank, from_file + offset_file
-                        while is_valid_square(target_rank, target_file):
-                            if square == get_square(target_rank, target_file):
-                                return True
-                            if not self.is_empty_square(get_square(target_rank, target_file)):
-                                break
-                            target_rank += offset_rank
-                            target_file += offset_file
-
-                elif piece.piece_type == PieceType.KING:
-                    # King attacks
-                    for offset_rank, offset_file in zip([-1, -1, -1, 0, 1, 1, 1, 0], [-1, 0, 1, 1, 1, 0, -1, -1]):
-                        target_rank, target_file = from_rank + offset_rank, from_file + offset_file
-                        if is_valid_square(target_rank, target_file) and square == get_square(target_rank, target_file):
-                            return True
-        return False
+        opponent = BLACK if self.turn is Color.WHITE else WHITE
+        return bool(self._attack_map(opponent) & BB_SQUARES[square.index])
 
+    def _king_attacked(self, color: int) -> bool:
+        king = self.bitboards[color * 6 + KING]
+        return bool(king) and bool(self._attackers_mask(color ^ 1, msb(king), self.occupied))
 
     def is_in_check(self) -> bool:
-        # Return true if the current player is checking the opponent
-        king_pos = None
-        for sq in Square:
-            if self[sq] == Piece(PieceType.KING, self.turn):
-                king_pos = sq
+        # Return true if the king of the side to move is attacked
+        return self._king_attacked(WHITE if self.turn is Color.WHITE else BLACK)
+
+    def legal_targets(self, square: Square) -> int:
+        # Mask of the squares the piece on square can legally move to, from the per-position index
+        return self.legal_moves.targets(square.index)
+
+    def legal_moves_between(self, from_square: Square, to_square: Square) -> Tuple[Move, ...]:
+        # The legal moves from one square to another: none, one, or the four promotions (queen first)
+        return self.legal_moves.between(from_square.index, to_square.index)
+
+    def is_legal(self, move: Move) -> bool:
+        legal_moves = self._legal_moves_cache.get(self._hash)
+        if legal_moves is not None:
+            return move in legal_moves
+        # Validate just this move: generate the legal moves of its piece onto its target square only
+        context = self._legal_context()
+        if context is None:
+            return move in self.generate_pseudo_legal_moves()
+        from_mask = BB_SQUARES[move.from_square.index]
+        if not self.occupied_co[context[0]] & from_mask:
+            return False
+        to_mask = BB_SQUARES[move.to_square.index]
+        candidates = []
+        self._append_legal_moves(candidates, context, to_mask, to_mask, from_mask=from_mask)
+        return move in candidates
+
+    def is_capture(self, move: Move) -> bool:
+        if self.occupied & BB_SQUARES[move.to_square.index]:
+            return True
+        # En passant lands on an empty square
+        return move.to_square == self.ep_square and \
+            bool((self.bitboards[PAWN] | self.bitboards[6 + PAWN]) & BB_SQUARES[move.from_square.index])
+
+    def mvv_lva(self, move: Move) -> int:
+        # Ordering key for captures and promotions: most valuable victim first, least valuable attacker breaking
+        # ties, plus the value a promotion adds. Higher is better; a quiet move scores at most 0.
+        victim = self.piece_index_at(move.to_square.index)
+        score = -PIECE_VALUES[self.piece_index_at(move.from_square.index) % 6] // 10
+        if victim >= 0:
+            score += 10 * PIECE_VALUES[victim % 6]
+        elif self.is_capture(move):
+            score += 10 * PIECE_VALUES[PAWN]
+        if move.promotion is not None:
+            score += PIECE_VALUES[PIECE_TYPE_INDICES[move.promotion]] - PIECE_VALUES[PAWN]
+        return score
+
+    def see(self, move: Move) -> int:
+        # Static exchange evaluation: the material the side to move wins (negative if it loses) by playing move
+        # and then both sides recapturing on its target square with their least valuable attacker for as long as
+        # it pays. Sliders uncovered by a capture join in; pins and checks are ignored.
+        from_index = move.from_square.index
+        to_index = move.to_square.index
+        piece_index = self.piece_index_at(from_index)
+        if piece_index < 0:
+            return 0
+        bitboards = self.bitboards
+        occupied = self.occupied ^ BB_SQUARES[from_index]
+        victim = self.piece_index_at(to_index)
+        if victim >= 0:
+            gain = PIECE_VALUES[victim % 6]
+        elif piece_index % 6 == PAWN and move.to_square == self.ep_square and from_index & 7 != to_index & 7:
+            gain = PIECE_VALUES[PAWN]
+            occupied ^= BB_SQUARES[to_index - 8 if piece_index < 6 else to_index + 8]
+        else:
+            gain = 0
+        on_square = PIECE_VALUES[piece_index % 6]
+        if move.promotion is not None:
+            on_square = PIECE_VALUES[PIECE_TYPE_INDICES[move.promotion]]
+            gain += on_square - PIECE_VALUES[PAWN]
+
+        gains = [gain]
+        side = piece_index // 6 ^ 1
+        attackers = self._attackers_mask(WHITE, to_index, occupied) | self._attackers_mask(BLACK, to_index, occupied)
+        while True:
+            attackers &= occupied
+            own = attackers & self.occupied_co[side]
+            if not own:
+                break
+            for piece_type in range(6):
+                candidates = own & bitboards[side * 6 + piece_type]
+                if candidates:
+                    break
+            if piece_type == KING and attackers & self.occupied_co[side ^ 1]:
+                # The king may only take last
                 break
-        for sq in Square:
-            if self[sq].piece_type != PieceType.EMPTY and self[sq].color != self.turn:
-                if self.is_under_attack(king_pos):
+            value = on_square
+            on_square = PIECE_VALUES[piece_type]
+            if piece_type == PAWN and BB_SQUARES[to_index] & BB_BACKRANKS:
+                value += PIECE_VALUES[QUEEN] - PIECE_VALUES[PAWN]
+                on_square = PIECE_VALUES[QUEEN]
+            gains.append(value - gains[-1])
+            occupied ^= candidates & -candidates
+            # Sliders behind the piece that just took can now reach the square
+            attackers |= (bishop_attacks(to_index, occupied) & (bitboards[BISHOP] | bitboards[QUEEN] |
+                                                                 bitboards[6 + BISHOP] | bitboards[6 + QUEEN])) | \
+                         (rook_attacks(to_index, occupied) & (bitboards[ROOK] | bitboards[QUEEN] |
+                                                               bitboards[6 + ROOK] | bitboards[6 + QUEEN]))
+            side ^= 1
+        # Either side may stop recapturing when continuing would lose
+        while len(gains) > 1:
+            last = gains.pop()
+            gains[-1] = -max(-gains[-1], last)
+        return gains[0]
+
+    def parse_san(self, san: str) -> Move:
+        # The legal move of the side to move written as san in standard algebraic notation, e.g. 'Nbd7', 'exd6',
+        # 'e8=Q+', 'O-O-O'. Raises InvalidMoveError for bad notation, IllegalMoveError if no legal move matches
+        # and AmbiguousMoveError if several do.
+        us = WHITE if self.turn is Color.WHITE else BLACK
+        castling_step = SAN_CASTLING.get(san.rstrip("+#!?"))
+        if castling_step is not None:
+            king_mask = self.bitboards[us * 6 + KING]
+            if not king_mask:
+                raise IllegalMoveError(f"No king to castle: {san}")
+            from_mask = king_mask
+            to_index = msb(king_mask) + castling_step
+            if not 0 <= to_index < 64:
+                raise IllegalMoveError(f"Illegal castling: {san}")
+            promotion = None
+        else:
+            match = SAN_REGEX.match(san)
+            if match is None:
+                raise InvalidMoveError(f"Invalid SAN: {san}")
+            piece_letter, file, rank, target, promotion_letter = match.groups()
+            from_mask = self.bitboards[us * 6 + (PIECE_TYPE_INDICES_BY_LETTER[piece_letter] if piece_letter else PAWN)]
+            if file:
+                from_mask &= BB_FILES[ord(file) - ord('a')]
+            if rank:
+                from_mask &= BB_RANKS[int(rank) - 1]
+            to_index = Square(target).index
+            promotion = PieceType(promotion_letter.lower()) if promotion_letter else None
+            if promotion is not None and piece_letter:
+                raise InvalidMoveError(f"Only pawns promote: {san}")
+
+        context = self._legal_context()
+        if context is None:
+            candidates = [move for move in self.generate_pseudo_legal_moves()
+                          if BB_SQUARES[move.from_square.index] & from_mask]
+        else:
+            to_mask = BB_SQUARES[to_index]
+            candidates = []
+            self._append_legal_moves(candidates, context, to_mask, to_mask, castling=castling_step is not None,
+                                     from_mask=from_mask)
+        matches = [move for move in candidates if move.to_square.index == to_index and move.promotion is promotion]
+        if not matches:
+            raise IllegalMoveError(f"Illegal move: {san}")
+        if len(matches) > 1:
+            raise AmbiguousMoveError(f"Ambiguous move: {san}")
+        return matches[0]
+
+    def perft(self, depth: int) -> int:
+        # Number of leaf nodes of the legal move tree of the given depth
+        if depth <= 0:
+            return 1
+        moves = self.generate_legal_moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self.perform_move(move)
+            nodes += self.perft(depth - 1)
+            self.pop()
+        return nodes
+
+    def perft_divide(self, depth: int) -> Dict[str, int]:
+        # Perft node count below each legal root move, keyed by UCI
+        divide = {}
+        for move in self.generate_legal_moves():
+            self.perform_move(move)
+            divide[move.uci()] = self.perft(depth - 1)
+            self.pop()
+        return divide
+
+    def outcome(self) -> Optional[Outcome]:
+        # How the game ended in this position, or None if it goes on
+        return self._position_status().outcome
+
+    def _position_status(self) -> _PositionStatus:
+        # perform_move and pop drop the status, as they change the repetition history; the key catches the
+        # changes made by setting up a position or placing pieces
+        key = (self._hash, self.halfmove_clock, self._stack[-1] if self._stack else None)
+        if self._status_key != key or self._status is None:
+            self._status = self._evaluate_status()
+            self._status_key = key
+        return self._status
+
+    def _evaluate_status(self) -> _PositionStatus:
+        in_check = self.is_in_check()
+        has_legal_move = self.any_legal_move()
+        insufficient_material = self._insufficient_material(WHITE) and self._insufficient_material(BLACK)
+        fifty_moves = self.halfmove_clock >= 100
+        threefold_repetition = self.is_repetition(3)
+
+        outcome = None
+        if not has_legal_move:
+            if in_check:
+                outcome = Outcome(Termination.CHECKMATE, Color(-self.turn.value))
+            else:
+                outcome = Outcome(Termination.STALEMATE, None)
+        elif insufficient_material:
+            outcome = Outcome(Termination.INSUFFICIENT_MATERIAL, None)
+        elif fifty_moves:
+            outcome = Outcome(Termination.FIFTY_MOVES, None)
+        elif threefold_repetition:
+            outcome = Outcome(Termination.THREEFOLD_REPETITION, None)
+        return _PositionStatus(in_check, has_legal_move, insufficient_material, fifty_moves, threefold_repetition,
+                               outcome)
+
+    def is_repetition(self, count: int = 3) -> bool:
+        # True if the current position occurred at least count times since the last capture or pawn move,
+        # looking at the hashes in the undo stack
+        stack = self._stack
+        occurrences = 1
+        for i in range(len(stack) - 2, max(len(stack) - 1 - self.halfmove_clock, 0) - 1, -2):
+            if stack[i].zobrist_hash == self._hash:
+                occurrences += 1
+                if occurrences >= count:
                     return True
-        return False
-
-    def is_legal(self, move: Move):
-        return move in self.legal_moves
+        return occurrences >= count
+
+    def _insufficient_material(self, color: int) -> bool:
+        # True if color cannot possibly checkmate, whatever the opponent plays
+        bitboards = self.bitboards
+        own = self.occupied_co[color]
+        base = color * 6
+        if bitboards[base + PAWN] | bitboards[base + ROOK] | bitboards[base + QUEEN]:
+            return False
+        opponent_base = (color ^ 1) * 6
+        if bitboards[base + KNIGHT]:
+            # A lone knight can only mate if the opponent has pieces that can block its own king
+            return popcount(own) <= 2 and not (self.occupied_co[color ^ 1] & ~bitboards[opponent_base + KING]
+                                               & ~bitboards[opponent_base + QUEEN])
+        if bitboards[base + BISHOP]:
+            # Bishops of both sides that all stand on one square color cannot mate unless the opponent can block
+            # with a pawn or a knight
+            bishops = bitboards[BISHOP] | bitboards[6 + BISHOP]
+            same_color = not bishops & BB_DARK_SQUARES or not bishops & BB_LIGHT_SQUARES
+            return same_color and not bitboards[opponent_base + PAWN] and not bitboards[opponent_base + KNIGHT]
+        return True
 
     def is_stalemate(self):
-        return len(self.legal_moves) == 0 and not self.is_in_check()
+        status = self._position_status()
+        return not status.has_legal_move and not status.in_check
 
     def is_checkmate(self):
-        return len(self.legal_moves) == 0 and self.is_in_check()
+        status = self._position_status()
+        return not status.has_legal_move and status.in_check
 
     def insufficient_material(self) -> bool:
-        def count_material(color):
-            return sum(self[square].piece_type != PieceType.EMPTY and self[square].color == color for square in Square)
+        return self._position_status().insufficient_material
 
-        white_material, black_material = count_material(Color.WHITE), count_material(Color.BLACK)
+    def is_fifty_moves(self) -> bool:
+        # 50 moves by each side without a capture or pawn move
+        return self._position_status().fifty_moves
 
-        return white_material == black_material == 1 or (
-                white_material <= 2 and not any(self[square].piece_type != PieceType.PAWN and self[square].color == Color.WHITE for square in Square)
-        ) or (
-                black_material <= 2 and not any(self[square].piece_type != PieceType.PAWN and self[square].color == Color.BLACK for square in Square)
-        )
+    def is_threefold_repetition(self) -> bool:
+        return self._position_status().threefold_repetition
 
     def is_terminated(self):
-        return self.is_checkmate() or self.is_stalemate() or self.halfmove_clock == 50 or self.insufficient_material()
+        return self._position_status().outcome is not None
+
+    def evaluate(self) -> int:
+        # Static evaluation in centipawns from the point of view of the side to move: material and piece-square
+        # scores tapered between middlegame and endgame by the material left. O(1), the terms are kept up to date
+        # as pieces move.
+        score = tapered_score(self._score, self._phase)
+        return score if self.turn is Color.WHITE else -score
+
+    def probe_wdl(self, tablebase=None) -> Optional[int]:
+        # Endgame tablebase result for the side to move: 1 win, 0 draw, -1 loss, None if no table covers the
+        # position. Uses the tables in chess.tablebase.TABLEBASE_PATH unless a Tablebase is given.
+        from .tablebase import default_tablebase
+        return (default_tablebase() if tablebase is None else tablebase).probe_wdl(self)
+
+    def probe_dtm(self, tablebase=None) -> Optional[int]:
+        # Plies to mate with best play, positive if the side to move mates and negative if it gets mated, 0 for
+        # a draw; None if no table covers the position
+        from .tablebase import default_tablebase
+        return (default_tablebase() if tablebase is None else tablebase).probe_dtm(self)
 
     def push(self, move: Move):
         if self.is_terminated():
@@ -491,20 +1219,3 @@ class Board:
 
     def __str__(self):
         return '\n'.join([' '.join([str(self[get_square(x, y)]) for y in range(8)]) for x in range(7,-1,-1)])
-
-#
-# board = Board()
-# # while not board.is_terminated():
-# for move in "e2e4 e7e5 f1c4 f8c5 d1h5 d7d6 b1c3 a7a5 g1f3 a5a4 e1g1 h7h6 b2b4 a4b3 h5f7 ".split():
-#     print(board.legal_moves)
-#     print(board.castling_right)
-#     print(board.turn)
-#     print(board.ep_square)
-#     print(board.move_stack)
-#     print(board.can_castle_kingside())
-#     print(board)
-#     # move = input("Enter your move (UCI): ")
-#     board.push(Move.from_uci(move))
-#
-
-#e2e4 e7e5 f1c4 f8c5 d1h5 d7d6 b1c3 a7a5 g1f3 a5a4 e1g1 h7h6 b2b4 a4b3 a6a5 h5f7
\ No newline at end of file
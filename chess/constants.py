@@ -35,6 +35,14 @@ class PieceType(Enum):
         return self.value.__hash__()
 
 
+class Termination(Enum):
+    CHECKMATE = 'checkmate'
+    STALEMATE = 'stalemate'
+    INSUFFICIENT_MATERIAL = 'insufficient material'
+    FIFTY_MOVES = '50-move rule'
+    THREEFOLD_REPETITION = 'threefold repetition'
+
+
 def piece_symbol(piece_type: PieceType) -> str:
     return piece_type.value
 
@@ -55,6 +63,11 @@ class Square(Enum):
     A7, B7, C7, D7, E7, F7, G7, H7 = squares[48:56]
     A8, B8, C8, D8, E8, F8, G8, H8 = squares[56:]
 
+    def __init__(self, name: str):
+        # Integer index (a1 = 0, ..., h8 = 63), rank and file, computed once per square
+        self.index: int = (ord(name[1]) - ord('1')) * 8 + ord(name[0]) - ord('a')
+        self.rank_index: int = self.index >> 3
+        self.file_index: int = self.index & 7
 
     def parse_square(cls, name: str) -> Self:
         return Square(name)
@@ -64,9 +77,11 @@ class Square(Enum):
         return self.value
 
 
+SQUARES = list(Square)    # SQUARES[square.index] is square
+
 
 def get_square(rank_index, file_index):
-    return Square(FILE_NAMES[file_index] + RANK_NAMES[rank_index])
+    return SQUARES[rank_index * 8 + file_index]
 
 
 def is_valid_square(rank, file):
@@ -74,9 +89,10 @@ def is_valid_square(rank, file):
 
 
 def square_file_index(square: Square):
-    return ord(square.value[0]) - ord('a')
+    return square.file_index
 
 
 def square_rank_index(square: Square):
-    return ord(square.value[1]) - ord('1')
+    return square.rank_index
+
 
@@ -0,0 +1,63 @@
+from itertools import islice
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from .board import *
+
+# planes[n, piece_index, rank, file] is 1 where board n has that piece, with piece_index as in Board.bitboards
+# (white pawn .. white king, black pawn .. black king) and rank 0 being the first rank, as in Board.board.
+PLANE_COUNT = 12
+# features[n] holds the side to move, the castling rights and the en passant file, one column each:
+FEATURE_NAMES = ["white_to_move", "K", "Q", "k", "q"] + [f"ep_{file}" for file in "abcdefgh"]
+FEATURE_COUNT = len(FEATURE_NAMES)
+ENCODE_CHUNK_SIZE = 8192    # Boards gathered per vectorized step
+
+_NO_EP = 64
+# Castling corners in FEATURE_NAMES order
+_CASTLING_SHIFTS = np.array([7, 0, 63, 56], dtype=np.uint64)
+
+
+def _encode_chunk(rows: np.ndarray, planes: np.ndarray, features: np.ndarray):
+    # rows[n] are the 12 bitboards, castling rights, white-to-move flag and en passant square of one board
+    bitboards = np.ascontiguousarray(rows[:, :PLANE_COUNT]).astype('<u8', copy=False)
+    # Little-endian bytes of every bitboard, unpacked low bit first, give the squares in a1..h8 order
+    bits = np.unpackbits(bitboards.view(np.uint8).reshape(len(rows), PLANE_COUNT, 8), axis=2, bitorder='little')
+    planes[...] = bits.reshape(len(rows), PLANE_COUNT, 8, 8)
+    features[:, 0] = rows[:, PLANE_COUNT + 1]
+    features[:, 1:5] = (rows[:, PLANE_COUNT, None] >> _CASTLING_SHIFTS) & 1
+    ep = rows[:, PLANE_COUNT + 2]
+    features[:, 5:] = (ep[:, None] != _NO_EP) & ((ep[:, None] & 7) == np.arange(8, dtype=np.uint64))
+
+
+def encode_batch(boards: Iterable[Board], out: Optional[np.ndarray] = None,
+                 features_out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    # Encode boards into (N, 12, 8, 8) uint8 piece planes and (N, FEATURE_COUNT) uint8 features.
+    # Without out, the boards are collected and both arrays are allocated. With out (and optionally
+    # features_out), which may be np.memmap or np.lib.format.open_memmap arrays, the boards are consumed lazily
+    # ENCODE_CHUNK_SIZE at a time and written in place, so a dataset never has to exist as Board objects all at
+    # once; the returned arrays are views of the rows written.
+    if out is None:
+        boards = list(boards)
+        out = np.empty((len(boards), PLANE_COUNT, 8, 8), dtype=np.uint8)
+    elif out.ndim != 4 or out.shape[1:] != (PLANE_COUNT, 8, 8) or out.dtype != np.uint8:
+        raise ValueError(f"out must be a uint8 array of shape (N, {PLANE_COUNT}, 8, 8)")
+    if features_out is None:
+        features_out = np.empty((len(out), FEATURE_COUNT), dtype=np.uint8)
+    elif features_out.shape != (len(out), FEATURE_COUNT) or features_out.dtype != np.uint8:
+        raise ValueError(f"features_out must be a uint8 array of shape ({len(out)}, {FEATURE_COUNT})")
+
+    boards = iter(boards)
+    count = 0
+    while True:
+        rows = [board.bitboards + [board.castling_rights, board.turn is Color.WHITE,
+                                   board.ep_square.index if board.ep_square is not None else _NO_EP]
+                for board in islice(boards, ENCODE_CHUNK_SIZE)]
+        if not rows:
+            break
+        if count + len(rows) > len(out):
+            raise ValueError(f"More boards than the {len(out)} rows of out")
+        _encode_chunk(np.array(rows, dtype=np.uint64), out[count:count + len(rows)],
+                      features_out[count:count + len(rows)])
+        count += len(rows)
+    return out[:count], features_out[:count]
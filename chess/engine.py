@@ -0,0 +1,308 @@
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from .board import *
+
+MATE_SCORE = 100_000
+MATE_THRESHOLD = MATE_SCORE - 1_000     # Scores beyond this are mates; the distance in plies is kept in the score
+INFINITY = MATE_SCORE + 1
+MAX_PLY = 128
+DEFAULT_DEPTH = 4
+TRANSPOSITION_TABLE_SIZE = 1 << 20      # Entries; must be a power of two
+CHECK_INTERVAL = 256                    # Nodes between checks of the clock and the stop flag
+
+# Transposition table bounds
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+# Move ordering: transposition table move, captures by MVV-LVA, killer moves, then quiet moves by history
+_TT_MOVE_ORDER = 1_000_000
+_CAPTURE_ORDER = 100_000
+_KILLER_ORDER = 90_000
+
+
+def evaluate(board: Board) -> int:
+    # Static evaluation in centipawns from the point of view of the side to move, kept incrementally by the board
+    return board.evaluate()
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    depth: int
+    score: int      # Centipawns from the point of view of the side to move, see mate for mate scores
+    nodes: int
+    time: float     # Seconds
+    pv: List[Move]
+
+    @property
+    def best_move(self) -> Optional[Move]:
+        return self.pv[0] if self.pv else None
+
+    @property
+    def nps(self) -> int:
+        return int(self.nodes / max(self.time, 1e-9))
+
+    @property
+    def mate(self) -> Optional[int]:
+        # Moves until mate, negative if the side to move is getting mated, or None
+        if abs(self.score) < MATE_THRESHOLD:
+            return None
+        moves = (MATE_SCORE - abs(self.score) + 1) // 2
+        return moves if self.score > 0 else -moves
+
+    def __str__(self):
+        score = f"mate {self.mate}" if self.mate is not None else f"cp {self.score}"
+        return (f"depth {self.depth} score {score} nodes {self.nodes} nps {self.nps} time {int(self.time * 1000)} "
+                f"pv {' '.join(move.uci() for move in self.pv)}")
+
+
+class _SearchStopped(Exception):
+    pass
+
+
+def _score_to_table(score: int, ply: int) -> int:
+    # Mate scores are stored relative to the node, not to the root
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_table(score: int, ply: int) -> int:
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+class Engine:
+    # Negamax alpha-beta search with iterative deepening, a transposition table, killer and history move
+    # ordering and quiescence search. The table and history are kept between searches.
+    def __init__(self, table_size: int = TRANSPOSITION_TABLE_SIZE):
+        if table_size <= 0 or table_size & (table_size - 1):
+            raise ValueError("Transposition table size must be a power of two")
+        # Entries are (zobrist hash, depth, score, bound, best move), indexed by the low bits of the hash
+        self._table: List[Optional[tuple]] = [None] * table_size
+        self._table_mask = table_size - 1
+        self._killers: List[List[Optional[Move]]] = [[None, None] for _ in range(MAX_PLY + 1)]
+        self._history: Dict[Move, int] = {}
+        self._pv: List[List[Move]] = [[] for _ in range(MAX_PLY + 1)]
+        self._stopped = False
+        self._deadline: Optional[float] = None
+        self.nodes = 0
+
+    def clear(self):
+        # Forget everything learned in earlier searches
+        self._table = [None] * len(self._table)
+        self._history.clear()
+
+    def stop(self):
+        # Ask a running search to return its last completed iteration; safe to call from another thread
+        self._stopped = True
+
+    def reset_stop(self):
+        # Clear an earlier stop request. A caller that starts searches on another thread calls this before
+        # starting one and passes keep_stop=True to search, so a stop sent while the search starts is not lost.
+        self._stopped = False
+
+    def search(self, board: Board, depth: Optional[int] = None, time_limit: Optional[float] = None,
+               info: Optional[Callable[[SearchResult], None]] = None, keep_stop: bool = False) -> SearchResult:
+        # Search until depth is reached or time_limit seconds have passed, whichever comes first (the default is
+        # DEFAULT_DEPTH). info is called with the result of every completed iteration. The board is not changed.
+        # An earlier stop() is forgotten unless keep_stop is set, in which case it ends the search at once.
+        if not keep_stop:
+            self._stopped = False
+        if depth is None:
+            depth = DEFAULT_DEPTH if time_limit is None else MAX_PLY
+        depth = max(1, min(depth, MAX_PLY))
+        start = time.perf_counter()
+        self._deadline = start + time_limit if time_limit is not None else None
+        self.nodes = 0
+        self._killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        for move in self._history:
+            self._history[move] //= 8
+
+        board = board.copy()
+        result = None
+        for iteration_depth in range(1, depth + 1):
+            try:
+                # Nodes only check the limits every CHECK_INTERVAL nodes; a small iteration may never reach one
+                self._check_limits()
+                score = self._negamax(board, iteration_depth, -INFINITY, INFINITY, 0)
+            except _SearchStopped:
+                break
+            result = SearchResult(iteration_depth, score, self.nodes, time.perf_counter() - start, list(self._pv[0]))
+            if info is not None:
+                info(result)
+            if abs(score) >= MATE_THRESHOLD and MATE_SCORE - abs(score) <= iteration_depth:
+                # A forced mate was found within the full-width depth; searching deeper cannot change it
+                break
+            if self._deadline is not None and time.perf_counter() - start > (self._deadline - start) / 2:
+                # The next iteration would most likely not finish in time
+                break
+
+        if result is None:
+            # Stopped before the first iteration completed: fall back to any legal move
+            moves = board.generate_legal_moves()
+            result = SearchResult(0, 0, self.nodes, time.perf_counter() - start, moves[:1])
+        return result
+
+    def _check_limits(self):
+        if self._stopped or (self._deadline is not None and time.perf_counter() >= self._deadline):
+            raise _SearchStopped()
+
+    def _negamax(self, board: Board, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self._check_limits()
+        self._pv[ply] = []
+        if ply and (board.halfmove_clock >= 100 or board.is_repetition(2)):
+            return 0
+
+        in_check = board.is_in_check()
+        if in_check:
+            # Check extension: never drop into quiescence while in check
+            depth += 1
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiescence(board, alpha, beta, ply)
+
+        key = board.zobrist_hash()
+        entry = self._table[key & self._table_mask]
+        table_move = None
+        if entry is not None and entry[0] == key:
+            table_move = entry[4]
+            if ply and entry[1] >= depth:
+                score = _score_from_table(entry[2], ply)
+                bound = entry[3]
+                if bound == EXACT or (bound == LOWER_BOUND and score >= beta) or \
+                        (bound == UPPER_BOUND and score <= alpha):
+                    return score
+
+        moves = board.generate_legal_moves()
+        if not moves:
+            return -MATE_SCORE + ply if in_check else 0
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        killers = self._killers[ply]
+        for move in self._order_moves(board, moves, table_move, killers):
+            quiet = not board.is_capture(move) and move.promotion is None
+            board.perform_move(move)
+            score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            board.pop()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self._pv[ply] = [move] + self._pv[ply + 1]
+                    if score >= beta:
+                        if quiet:
+                            if killers[0] is not move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            self._history[move] = self._history.get(move, 0) + depth * depth
+                        break
+
+        if best_score <= original_alpha:
+            bound = UPPER_BOUND
+        elif best_score >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        self._table[key & self._table_mask] = (key, depth, _score_to_table(best_score, ply), bound, best_move)
+        return best_score
+
+    def _quiescence(self, board: Board, alpha: int, beta: int, ply: int) -> int:
+        # Resolve captures (and check evasions) until the position is quiet, so the static evaluation is not
+        # taken in the middle of an exchange
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self._check_limits()
+        self._pv[ply] = []
+
+        in_check = board.is_in_check()
+        if in_check:
+            best_score = -INFINITY
+        else:
+            best_score = evaluate(board)
+            if best_score >= beta or ply >= MAX_PLY:
+                return best_score
+            alpha = max(alpha, best_score)
+
+        if in_check:
+            moves = board.generate_legal_moves()
+            if not moves:
+                return -MATE_SCORE + ply
+            if ply >= MAX_PLY:
+                return evaluate(board)
+            moves = self._order_moves(board, moves, None, None)
+        else:
+            captures = board.generate_captures()
+            if not captures and not board.any_legal_move():
+                return 0
+            # Captures that lose material in the exchange cannot beat standing pat; skip them unplayed
+            moves = [move for move in captures
+                     if (move.promotion is None or move.promotion is PieceType.QUEEN) and board.see(move) >= 0]
+
+        for move in moves:
+            board.perform_move(move)
+            score = -self._quiescence(board, -beta, -alpha, ply + 1)
+            board.pop()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    self._pv[ply] = [move] + self._pv[ply + 1]
+                    if score >= beta:
+                        break
+        return best_score
+
+    def _order_moves(self, board: Board, moves: List[Move], table_move: Optional[Move],
+                     killers: Optional[List[Optional[Move]]]) -> List[Move]:
+        history = self._history
+        scores = {}
+        for move in moves:
+            if move is table_move:
+                scores[move] = _TT_MOVE_ORDER
+                continue
+            if move.promotion is not None or board.is_capture(move):
+                scores[move] = _CAPTURE_ORDER + board.mvv_lva(move)
+            elif killers is not None and move is killers[0]:
+                scores[move] = _KILLER_ORDER
+            elif killers is not None and move is killers[1]:
+                scores[move] = _KILLER_ORDER - 1
+            else:
+                scores[move] = min(history.get(move, 0), _KILLER_ORDER - 2)
+        return sorted(moves, key=scores.__getitem__, reverse=True)
+
+
+def search(board: Board, depth: Optional[int] = None, time_limit: Optional[float] = None,
+           info: Optional[Callable[[SearchResult], None]] = None) -> SearchResult:
+    # One-off search with a fresh engine; keep an Engine around to reuse its transposition table
+    return Engine().search(board, depth, time_limit, info)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess.engine", description="Search a position")
+    parser.add_argument("--fen", default=STARTING_FEN, help="position to search (default: start position)")
+    parser.add_argument("--depth", type=int, help=f"maximum depth (default: {DEFAULT_DEPTH} without --time)")
+    parser.add_argument("--time", type=float, help="time limit in seconds")
+    args = parser.parse_args(argv)
+
+    try:
+        board = Board(args.fen)
+    except InvalidFenError as error:
+        parser.error(str(error))
+    result = search(board, args.depth, args.time, info=lambda iteration: print(f"info {iteration}"))
+    print(f"bestmove {result.best_move.uci() if result.best_move else '(none)'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
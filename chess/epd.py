@@ -0,0 +1,22 @@
+from os import PathLike
+from typing import Dict, Iterator, TextIO, Tuple
+
+from .board import *
+
+
+def read_epd(source: str | PathLike | TextIO) -> Iterator[Tuple[Board, Dict[str, str]]]:
+    # Stream (board, operations) pairs from an EPD file, one line at a time, so files of any size can be read.
+    # Lines holding a full FEN are accepted too; blank lines and '#' comments are skipped.
+    if isinstance(source, (str, PathLike)):
+        with open(source, encoding="utf-8") as file:
+            yield from read_epd(file)
+        return
+    for line_number, line in enumerate(source, 1):
+        line = line.strip()
+        if not line or line[0] == '#':
+            continue
+        try:
+            board, operations = Board.from_epd(line)
+        except InvalidFenError as error:
+            raise InvalidFenError(f"Line {line_number}: {error}") from None
+        yield board, operations
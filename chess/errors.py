@@ -4,5 +4,11 @@ class InvalidMoveError(ValueError):
 class IllegalMoveError(ValueError):
     pass
 
+class AmbiguousMoveError(IllegalMoveError):
+    pass
+
 class GameTerminatedError(ValueError):
-    pass
\ No newline at end of file
+    pass
+
+class InvalidFenError(ValueError):
+    pass
@@ -0,0 +1,132 @@
+from typing import List, Tuple
+
+# Tables for the incremental evaluation kept by Board. Every piece on the board contributes a packed score from
+# PIECE_SQUARE_SCORES and a weight from PHASE_WEIGHTS; Board adds and subtracts them as pieces are placed and
+# removed, so evaluating a position never walks the board.
+
+PIECE_VALUES = [100, 320, 330, 500, 900, 0]     # Indexed by PAWN..KING
+
+# Game phase: 24 with all minor and major pieces on the board, falling to 0 as they are traded
+PHASE_WEIGHTS_BY_TYPE = [0, 1, 1, 2, 4, 0]
+PHASE_TOTAL = 24
+
+# Piece-square tables from white's point of view, laid out as the board is seen from white (a8 first).
+# Only pawns and the king play differently in the endgame.
+_PAWN_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+_PAWN_ENDGAME_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    80, 80, 80, 80, 80, 80, 80, 80,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    30, 30, 30, 30, 30, 30, 30, 30,
+    20, 20, 20, 20, 20, 20, 20, 20,
+    10, 10, 10, 10, 10, 10, 10, 10,
+    10, 10, 10, 10, 10, 10, 10, 10,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+_KNIGHT_TABLE = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+_BISHOP_TABLE = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+_ROOK_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0,
+]
+_QUEEN_TABLE = [
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20,
+]
+_KING_TABLE = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+]
+_KING_ENDGAME_TABLE = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+]
+_MIDDLEGAME_TABLES = [_PAWN_TABLE, _KNIGHT_TABLE, _BISHOP_TABLE, _ROOK_TABLE, _QUEEN_TABLE, _KING_TABLE]
+_ENDGAME_TABLES = [_PAWN_ENDGAME_TABLE, _KNIGHT_TABLE, _BISHOP_TABLE, _ROOK_TABLE, _QUEEN_TABLE, _KING_ENDGAME_TABLE]
+
+# A middlegame and an endgame score are packed into one int, middlegame * 2**SCORE_SHIFT + endgame, so a
+# piece moves both with one addition. Sums of packed scores unpack to the sums of their parts.
+SCORE_SHIFT = 32
+_ENDGAME_MASK = (1 << SCORE_SHIFT) - 1
+_ENDGAME_BIAS = 1 << (SCORE_SHIFT - 1)
+
+
+def pack_score(middlegame: int, endgame: int) -> int:
+    return (middlegame << SCORE_SHIFT) + endgame
+
+
+def unpack_score(score: int) -> Tuple[int, int]:
+    # (middlegame, endgame) of a packed score
+    endgame = ((score + _ENDGAME_BIAS) & _ENDGAME_MASK) - _ENDGAME_BIAS
+    return (score - endgame) >> SCORE_SHIFT, endgame
+
+
+def _piece_square_score(piece_type: int, table_index: int) -> int:
+    return pack_score(PIECE_VALUES[piece_type] + _MIDDLEGAME_TABLES[piece_type][table_index],
+                      PIECE_VALUES[piece_type] + _ENDGAME_TABLES[piece_type][table_index])
+
+
+# PIECE_SQUARE_SCORES[piece_index][square] is the packed material plus placement of a piece, positive for white
+# and negative for black; piece_index as in Board.bitboards
+PIECE_SQUARE_SCORES: List[List[int]] = \
+    [[_piece_square_score(piece_type, index ^ 56) for index in range(64)] for piece_type in range(6)] + \
+    [[-_piece_square_score(piece_type, index) for index in range(64)] for piece_type in range(6)]
+PHASE_WEIGHTS: List[int] = PHASE_WEIGHTS_BY_TYPE * 2     # By piece_index
+
+
+def tapered_score(score: int, phase: int) -> int:
+    # Blend the middlegame and endgame parts of a packed score by game phase; white's point of view, centipawns
+    middlegame, endgame = unpack_score(score)
+    phase = min(phase, PHASE_TOTAL)     # Promotions can take the phase past its starting value
+    return (middlegame * phase + endgame * (PHASE_TOTAL - phase)) // PHASE_TOTAL
@@ -1,25 +1,35 @@
 from sys import platform
 if platform == "darwin":
     from tkmacosx import Button
-    from tkinter import Tk, Toplevel, Label, Menu
-    square_width = square_height = 50
-    board_dimension = "400x400"
+    from tkinter import Tk, Toplevel, Label, Menu, Canvas
+    square_size = 50
 else:
     from tkinter import *
-    square_width = 3
-    square_height = 0
-    board_dimension = "700x700"
+    square_size = 80
+board_dimension = f"{8 * square_size}x{8 * square_size}"
 from .pieces import *
 from .constants import *
 from .board import *
 
+POLL_INTERVAL = 16          # Milliseconds between polls of the search worker (about 60 per second)
+ENGINE_TIME_LIMIT = 2.0     # Seconds the computer thinks per move
+
+LIGHT_SQUARE_COLOR = "gray"
+DARK_SQUARE_COLOR = "black"
+SELECTED_SQUARE_COLOR = "lightyellow"
+LAST_MOVE_COLORS = ("#8a8a4a", "#5c5c2e")    # Last move's squares, on light and dark squares
+TARGET_DOT_COLOR = "#3a8a3a"               # Legal destinations of the selected piece
+
 
 class PromotionPopup(Toplevel):
-    def __init__(self, master=None):
+    def __init__(self, master=None, callback=None):
         super().__init__(master)
         self.title("Promotion")
         self.geometry("200x250")
         self.result = None
+        # Called with the chosen piece type, or None if the popup is closed without a choice
+        self.callback = callback
+        self.protocol("WM_DELETE_WINDOW", lambda: self.set_promotion_choice(None))
 
         self.promotion_label = Label(self, text="Choose promotion:")
         self.promotion_label.pack(pady=10)
@@ -40,28 +50,85 @@ class PromotionPopup(Toplevel):
     def set_promotion_choice(self, piece_type):
         self.result = piece_type
         self.destroy()
+        if self.callback:
+            self.callback(piece_type)
 
 class TerminationPopup(Toplevel):
-    def __init__(self, master=None, termination="Checkmate"):
+    def __init__(self, master=None, termination="Checkmate", callback=None):
         super().__init__(master)
         self.title("Termination")
         self.geometry("200x200")
         self.result = None
+        # Called once the popup is closed
+        self.callback = callback
+        self.protocol("WM_DELETE_WINDOW", self.close)
 
         self.promotion_label = Label(self, text=termination)
         self.promotion_label.pack(pady=10)
 
+    def close(self):
+        self.destroy()
+        if self.callback:
+            self.callback()
 
     def set_promotion_choice(self, piece_type):
         self.result = piece_type
         self.destroy()
 
 
-class ChessButton(Button):
-    def __init__(self, master=None, piece=None, **kwargs):
-        super().__init__(master, **kwargs)
-        self.piece = piece
-        self.configure(text=piece_unicode(piece.piece_type), fg="white" if piece.color == Color.WHITE else "blue",font=(None, "35"))
+class BoardCanvas(Canvas):
+    # The board drawn on one Canvas. Every square has a fixed background, piece and dot item, created once and
+    # reused for the lifetime of the widget; render() only reconfigures the items of squares whose look changed.
+    def __init__(self, master=None, size=square_size, on_click=None):
+        super().__init__(master, width=8 * size, height=8 * size, borderwidth=0, highlightthickness=0)
+        self.size = size
+        self.on_click = on_click
+        self.square_items = []
+        self.piece_items = []
+        self.dot_items = []
+        self.drawn = [None] * 64     # (background, piece index, dot shown) of each square as last drawn
+        dot = size // 6
+        for index in range(64):
+            x = square_file(index) * size
+            y = (7 - square_rank(index)) * size
+            self.square_items.append(self.create_rectangle(x, y, x + size, y + size, width=0))
+            self.dot_items.append(self.create_oval(x + size // 2 - dot, y + size // 2 - dot, x + size // 2 + dot,
+                                                   y + size // 2 + dot, fill=TARGET_DOT_COLOR, width=0,
+                                                   state="hidden"))
+            self.piece_items.append(self.create_text(x + size // 2, y + size // 2, font=(None, size * 7 // 10)))
+        self.bind("<Button-1>", self.click)
+
+    def click(self, event):
+        file, row = event.x // self.size, event.y // self.size
+        if self.on_click and 0 <= file < 8 and 0 <= row < 8:
+            self.on_click(7 - row, file)
+
+    def render(self, board, selected=None, last_move=None, targets=BB_EMPTY):
+        # Bring every square in line with board; the Tk cost is proportional to the squares that changed
+        selected_index = selected.index if selected is not None else -1
+        last_move_mask = BB_SQUARES[last_move.from_square.index] | BB_SQUARES[last_move.to_square.index] \
+            if last_move is not None else BB_EMPTY
+        for index in range(64):
+            light = (square_rank(index) + square_file(index)) % 2 == 1
+            if index == selected_index:
+                background = SELECTED_SQUARE_COLOR
+            elif last_move_mask & BB_SQUARES[index]:
+                background = LAST_MOVE_COLORS[0 if light else 1]
+            else:
+                background = LIGHT_SQUARE_COLOR if light else DARK_SQUARE_COLOR
+            look = (background, board.piece_index_at(index), bool(targets & BB_SQUARES[index]))
+            drawn = self.drawn[index]
+            if look == drawn:
+                continue
+            if drawn is None or look[0] != drawn[0]:
+                self.itemconfigure(self.square_items[index], fill=background)
+            if drawn is None or look[1] != drawn[1]:
+                piece = PIECES[look[1]] if look[1] >= 0 else EMPTY_PIECE
+                self.itemconfigure(self.piece_items[index], text=piece_unicode(piece.piece_type),
+                                   fill="white" if piece.color == Color.WHITE else "blue")
+            if drawn is None or look[2] != drawn[2]:
+                self.itemconfigure(self.dot_items[index], state="normal" if look[2] else "hidden")
+            self.drawn[index] = look
 
 
 class ChessBoard(Tk):
@@ -71,117 +138,163 @@ class ChessBoard(Tk):
         self.title("Chess Board")
         self.geometry(board_dimension)
         self.resizable(False, False)
+        # Searches run in a worker process; the mainloop polls for their results with after(). Imported here so
+        # importing the package does not load the engine modules, which also run as scripts (python -m).
+        from .analysis import SearchWorker
+        self.search_worker = SearchWorker()
+        self.engine_move_pending = False
+        self.analysing = False
+        self.poll_scheduled = False
+        self.frozen = False
+        self.protocol("WM_DELETE_WINDOW", self.close)
         self.create_board()
 
+    def close(self):
+        self.search_worker.close()
+        self.destroy()
 
-    def restart_game(self):
-        self.chessboard.reset()
-        self.draw_board()
 
-    def _recreate_game(self, move_stack):
+    def restart_game(self):
+        self.stop_search()
         self.chessboard.reset()
-        for move in move_stack:
-            self.chessboard.perform_move(move)
+        self.selected_square = None
         self.redraw_board()
 
     def undo_move(self):
-        move_stack = self.chessboard.move_stack
-        move_stack.pop()
-        self._recreate_game(move_stack)
+        if self.frozen:
+            return
+        analysing = self.analysing
+        self.stop_search()
+        if self.chessboard.move_stack:
+            self.chessboard.pop()
+            self.redraw_board()
+        if analysing:
+            self.analyse()
+
+    def computer_move(self):
+        # Let the engine play the side to move
+        if self.frozen or self.chessboard.is_terminated():
+            return
+        self.stop_search()
+        self.selected_square = None
+        self.engine_move_pending = True
+        self.search_worker.start(self.chessboard, time_limit=ENGINE_TIME_LIMIT)
+        self.title("Chess Board - thinking...")
+        self.schedule_poll()
+
+    def analyse(self):
+        # Search the current position until stopped, showing the best line in the title bar
+        if self.chessboard.is_terminated():
+            return
+        self.stop_search()
+        self.analysing = True
+        self.search_worker.start(self.chessboard, depth=MAX_PLY)
+        self.schedule_poll()
+
+    def stop_search(self):
+        self.search_worker.cancel()
+        self.engine_move_pending = False
+        self.analysing = False
+        self.title("Chess Board")
+
+    def schedule_poll(self):
+        if not self.poll_scheduled:
+            self.poll_scheduled = True
+            self.after(POLL_INTERVAL, self.poll_search)
+
+    def poll_search(self):
+        self.poll_scheduled = False
+        for update in self.search_worker.poll():
+            result = update.result
+            score = f"mate {result.mate}" if result.mate is not None else f"{result.score / 100:+.2f}"
+            self.title(f"Chess Board - depth {result.depth}  {score}  {result.nps} nps  "
+                       + " ".join(move.uci() for move in result.pv[:6]))
+            if update.finished and self.engine_move_pending:
+                self.engine_move_pending = False
+                if result.best_move is not None:
+                    self.play_move(result.best_move)
+        if self.search_worker.is_running():
+            self.schedule_poll()
+
+    def play_move(self, move):
+        analysing = self.analysing
+        if analysing:
+            self.stop_search()
+        self.chessboard.push(move)
+        self.selected_square = None
+        self.redraw_board()
+        outcome = self.chessboard.outcome()
+        if outcome is not None:
+            if outcome.winner is not None:
+                self.show_termination_popup(outcome.winner.name + " won")
+            else:
+                self.show_termination_popup("Draw by " + outcome.termination.value)
+        elif analysing:
+            self.analyse()
 
     def create_board(self):
-        self.board = [[None for _ in range(8)] for _ in range(8)]
         self.chessboard = Board()
-        self.draw_board()
-
-    def draw_board(self):
-        for rank in range(8):
-            for file in range(8):
-                color = "gray" if (rank + file) % 2 == 1 else "black"
-                if self.selected_square != None and self.selected_square == get_square(rank, file):
-                    color = "lightyellow"
-                piece = self.chessboard[get_square(rank, file)]
-                square = ChessButton(self, piece=piece, bg=color, width=square_width, height=square_height, borderwidth=0, highlightthickness=0,
-                                     command=lambda r=rank, c=file: self.square_click(r, c))
-                square.grid(row=7-rank, column=file)
-                self.board[rank][file] = square
+        self.canvas = BoardCanvas(self, on_click=self.square_click)
+        self.canvas.pack()
+        self.redraw_board()
 
     def redraw_board(self):
-        for rank in range(8):
-            for file in range(8):
-                piece = self.chessboard[get_square(rank, file)]
-                color = "gray" if (rank + file) % 2 == 1 else "black"
-                if self.selected_square != None and self.selected_square == get_square(rank, file):
-                    color = "lightyellow"
-                self.board[rank][file].configure(bg=color, text=piece_unicode(piece.piece_type), fg="white" if piece.color == Color.WHITE else "blue",font=(None, "35"))
-        pass
+        # Dots on the legal destinations of the selected piece
+        targets = self.chessboard.legal_targets(self.selected_square) if self.selected_square is not None else BB_EMPTY
+        last_move = self.chessboard.move_stack[-1] if self.chessboard.move_stack else None
+        self.canvas.render(self.chessboard, self.selected_square, last_move, targets)
     def square_click(self, rank, file):
-        piece = self.chessboard[get_square(rank, file)]
+        if self.frozen or self.engine_move_pending:
+            return
+        square = get_square(rank, file)
         past_selected_square = self.selected_square
-        move_made = False
-        if self.selected_square:
-            selected_piece = self.chessboard[self.selected_square]
-            # print(self.chessboard.legal_moves)
-            if selected_piece.symbol() != "_" and selected_piece.color == self.chessboard.turn:
-                # A current piece is selected
-                try:
-                    move = Move(self.selected_square, get_square(rank, file))
-                    if self.chessboard[self.selected_square].piece_type == PieceType.PAWN and \
-                            (rank == 0 or rank == 7):
-                        move.promotion = PieceType.QUEEN # If promoted, king is not in check and move is legal
-                    if self.chessboard.is_legal(move):
-                        if self.chessboard[self.selected_square].piece_type == PieceType.PAWN and \
-                                (rank == 0 or rank == 7):
-                            move.promotion = self.show_promotion_popup()
-                        self.chessboard.push(move)
-                        self.selected_square = None
-                        move_made = True
-                        if self.chessboard.is_terminated():
-                            if self.chessboard.is_checkmate():
-                                self.show_termination_popup(Color(-self.chessboard.turn.value).name + " won")
-                            elif self.chessboard.is_stalemate():
-                                self.show_termination_popup("Draw by stalemate")
-                            elif self.chessboard.insufficient_material():
-                                self.show_termination_popup("Draw by insufficient material")
-                            else:
-                                self.show_termination_popup("Draw by 50-move rule")
-                    else:
-                        raise IllegalMoveError("Illegal move")
-                except GameTerminatedError:
-                    self.selected_square = None
-                except IllegalMoveError:
-                    self.selected_square = None
-            elif piece.symbol() != "_" and piece.color == self.chessboard.turn:
-                self.selected_square = get_square(rank, file)
+        if self.selected_square is not None and not self.chessboard.is_terminated():
+            # Look the click up in the position's legal move index instead of building and validating a move
+            moves = self.chessboard.legal_moves_between(self.selected_square, square)
+            if len(moves) > 1:
+                # A promotion: the move is played once a piece is chosen; the mainloop keeps running meanwhile
+                self.show_promotion_popup(moves[0])
+                return
+            if moves:
+                self.play_move(moves[0])
+                return
+        piece = self.chessboard[square]
+        if piece.piece_type != PieceType.EMPTY and piece.color == self.chessboard.turn and \
+                square is not self.selected_square:
+            # Select a piece, or switch to another one
+            self.selected_square = square
         else:
-            if piece != Piece.from_symbol("_") and piece.color == self.chessboard.turn:
-                self.selected_square = get_square(rank, file)
-        if move_made or past_selected_square != self.selected_square:
+            self.selected_square = None
+        if past_selected_square != self.selected_square:
             self.redraw_board()
 
-    def show_promotion_popup(self):
-        promotion_popup = PromotionPopup(self)
+    def show_promotion_popup(self, move):
+        def promote(piece_type):
+            self.unfreeze_board()
+            if piece_type is None:
+                self.selected_square = None
+                self.redraw_board()
+            else:
+                self.play_move(Move(move.from_square, move.to_square, piece_type))
+
+        PromotionPopup(self, callback=promote)
         self.freeze_board()
-        self.wait_window(promotion_popup)
-        self.unfreeze_board()
-        return promotion_popup.result
 
     def show_termination_popup(self, termination):
-        termination_popup = TerminationPopup(self, termination=termination)
+        def close():
+            self.unfreeze_board()
+            self.restart_game()
+
+        TerminationPopup(self, termination=termination, callback=close)
         self.freeze_board()
-        self.wait_window(termination_popup)
-        self.restart_game()
 
 
     def freeze_board(self):
-        for row in range(8):
-            for col in range(8):
-                self.board[row][col].configure(state="disabled")
+        # Clicks on the board are ignored until unfreeze_board
+        self.frozen = True
 
     def unfreeze_board(self):
-        for row in range(8):
-            for col in range(8):
-                self.board[row][col].configure(state="normal")
+        self.frozen = False
 
 def piece_unicode(piece_type):
     symbols = {
@@ -203,8 +316,13 @@ def start_game():
 
     board_menu = Menu(chess_board)
     chess_board.config(menu=board_menu)
-    board_menu.add_cascade(label="Game")
     game_menu = Menu(board_menu, tearoff=0)
+    board_menu.add_cascade(label="Game", menu=game_menu)
     game_menu.add_command(label="Restart Game", command=chess_board.restart_game)
     game_menu.add_command(label="Undo Move", command=chess_board.undo_move)
+    engine_menu = Menu(board_menu, tearoff=0)
+    board_menu.add_cascade(label="Engine", menu=engine_menu)
+    engine_menu.add_command(label="Computer Move", command=chess_board.computer_move)
+    engine_menu.add_command(label="Analyse", command=chess_board.analyse)
+    engine_menu.add_command(label="Stop", command=chess_board.stop_search)
     chess_board.mainloop()
\ No newline at end of file
@@ -0,0 +1,117 @@
+import functools
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, TextIO
+
+from .board import *
+
+# Methods that get a call counter and a cumulative timer while instrumentation is enabled. Times are inclusive:
+# a method's time contains the time of the instrumented methods it calls.
+INSTRUMENTED_METHODS: Dict[type, List[str]] = {
+    Board: [
+        "legal_moves", "generate_legal_moves", "generate_pseudo_legal_moves", "any_legal_move", "is_legal",
+        "generate_captures", "generate_checks", "see",
+        "generate_rook_moves", "generate_knight_moves", "generate_bishop_moves", "generate_queen_moves",
+        "generate_king_moves", "generate_pawn_moves",
+        "is_under_attack", "is_in_check", "attackers_of",
+        "perform_move", "pop", "push", "copy", "set_fen",
+        "outcome", "is_checkmate", "is_stalemate", "insufficient_material", "is_fifty_moves",
+        "is_threefold_repetition", "is_terminated", "_evaluate_status", "evaluate",
+    ],
+    # Every construction is a legal move list rebuilt because the position was not in the cache
+    LegalMoveWrapper: ["__init__"],
+}
+
+
+@dataclass(frozen=True)
+class CallStats:
+    calls: int
+    seconds: float
+
+    @property
+    def per_call(self) -> float:
+        return self.seconds / self.calls if self.calls else 0.0
+
+
+_counters: Dict[str, List] = {}     # Qualified name -> [calls, seconds]
+_originals: Dict[tuple, object] = {}    # (class, attribute) -> attribute before instrumentation
+
+
+def _timed(counter: List, function):
+    perf_counter = time.perf_counter
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            counter[0] += 1
+            counter[1] += perf_counter() - start
+    return wrapper
+
+
+def enable():
+    # Swap the instrumented methods for counting wrappers. Nothing is wrapped while disabled, so instrumentation
+    # costs nothing unless it is on.
+    if _originals:
+        return
+    for cls, names in INSTRUMENTED_METHODS.items():
+        for name in names:
+            original = cls.__dict__[name]
+            counter = _counters.setdefault(f"{cls.__name__}.{name}", [0, 0.0])
+            if isinstance(original, property):
+                wrapped = property(_timed(counter, original.fget), original.fset, original.fdel, original.__doc__)
+            else:
+                wrapped = _timed(counter, original)
+            _originals[cls, name] = original
+            setattr(cls, name, wrapped)
+
+
+def disable():
+    # Put the original methods back; the counters are kept until reset()
+    for (cls, name), original in _originals.items():
+        setattr(cls, name, original)
+    _originals.clear()
+
+
+def is_enabled() -> bool:
+    return bool(_originals)
+
+
+def reset():
+    for counter in _counters.values():
+        counter[0] = 0
+        counter[1] = 0.0
+
+
+def snapshot() -> Dict[str, CallStats]:
+    # Counters of every method called since the last reset, by qualified name
+    return {name: CallStats(calls, seconds) for name, (calls, seconds) in _counters.items() if calls}
+
+
+def format_report(stats: Dict[str, CallStats]) -> str:
+    lines = [f"{'method':<36} {'calls':>10} {'total ms':>11} {'us/call':>9}"]
+    for name, stat in sorted(stats.items(), key=lambda item: item[1].seconds, reverse=True):
+        lines.append(f"{name:<36} {stat.calls:>10} {stat.seconds * 1000:>11.2f} {stat.per_call * 1e6:>9.2f}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def instrumented(out: TextIO | None = sys.stderr) -> Iterator[Dict[str, CallStats]]:
+    # Count the block from zero and write a report to out when it ends (None for no report). The yielded dict
+    # is filled with the block's snapshot on exit.
+    was_enabled = is_enabled()
+    reset()
+    enable()
+    stats: Dict[str, CallStats] = {}
+    try:
+        yield stats
+    finally:
+        if not was_enabled:
+            disable()
+        stats.update(snapshot())
+        if out is not None:
+            print(format_report(stats), file=out)
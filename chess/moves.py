@@ -1,18 +1,36 @@
-from typing import Optional, Self
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Self, Tuple
 
 from .constants import *
 from .errors import *
 
 
-@dataclass
 class Move:
-    from_square: Square
-    to_square: Square
-    promotion: Optional[PieceType] = None
+    # Immutable flyweight: Move(from_square, to_square, promotion) always returns the same object for the same
+    # arguments, so moves compare and hash by identity
+    __slots__ = ('from_square', 'to_square', 'promotion')
+    _interned: Dict[Tuple[int, Optional[PieceType]], 'Move'] = {}
+
+    def __new__(cls, from_square: Square, to_square: Square, promotion: Optional[PieceType] = None) -> Self:
+        key = (from_square.index << 6 | to_square.index, promotion)
+        move = cls._interned.get(key)
+        if move is None:
+            move = object.__new__(cls)
+            object.__setattr__(move, 'from_square', from_square)
+            object.__setattr__(move, 'to_square', to_square)
+            object.__setattr__(move, 'promotion', promotion)
+            cls._interned[key] = move
+        return move
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Move is immutable")
+
+    def __reduce__(self):
+        return Move, (self.from_square, self.to_square, self.promotion)
 
     def uci(self) -> str:
-        # Example: 'e2e4' for pawn e2 -> e4
+        # Example: 'e2e4' for pawn e2 -> e4, 'e7e8q' for a promotion to queen
+        if self.promotion:
+            return self.from_square.value + self.to_square.value + self.promotion.value
         return self.from_square.value + self.to_square.value
 
     def __str__(self):
@@ -34,3 +52,21 @@ class Move:
         else:
             raise InvalidMoveError("Improper UCI")
 
+
+# MOVES[from_index][to_index] is the plain move between two squares, so move generation never has to build one
+MOVES: List[List[Optional[Move]]] = [[Move(from_square, to_square) if from_square is not to_square else None
+                                      for to_square in SQUARES] for from_square in SQUARES]
+
+PROMOTION_PIECE_TYPES = [PieceType.QUEEN, PieceType.ROOK, PieceType.BISHOP, PieceType.KNIGHT]
+
+
+def _promotion_moves(from_square: Square, to_square: Square) -> Tuple[Move, ...]:
+    if abs(from_square.file_index - to_square.file_index) <= 1 and (
+            (from_square.rank_index, to_square.rank_index) in ((6, 7), (1, 0))):
+        return tuple(Move(from_square, to_square, promotion) for promotion in PROMOTION_PIECE_TYPES)
+    return ()
+
+
+# PROMOTION_MOVES[from_index][to_index] are the four promotions of a pawn step, queen first
+PROMOTION_MOVES: List[List[Tuple[Move, ...]]] = [[_promotion_moves(from_square, to_square) for to_square in SQUARES]
+                                                 for from_square in SQUARES]
@@ -0,0 +1,186 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .board import *
+from .engine import *
+from .perft import PERFT_SUITE
+
+WORKER_TABLE_SIZE = 1 << 18     # Transposition table entries per worker process
+
+# Tasks get positions as FEN strings plus UCI moves, never pickled boards: a few dozen bytes each instead of
+# the board with its move stack, undo records and move cache
+
+_worker_engine: Optional[Engine] = None
+
+
+def _history(board: Board) -> Tuple[str, Tuple[str, ...]]:
+    # The position at the last capture or pawn move and the moves played since, which is all the history the
+    # repetition rules can see
+    root = board.copy()
+    moves = []
+    while root.move_stack and len(moves) < board.halfmove_clock:
+        moves.append(root.pop().uci())
+    return root.fen(), tuple(reversed(moves))
+
+
+def _load(fen: str, moves: Tuple[str, ...] = ()) -> Board:
+    board = Board(fen)
+    for uci in moves:
+        board.perform_move(Move.from_uci(uci))
+    return board
+
+
+def _perft_task(fen: str, depth: int) -> int:
+    return Board(fen).perft(depth)
+
+
+def _search_task(fen: str, moves: Tuple[str, ...], depth: int) -> Tuple[int, int, Tuple[str, ...]]:
+    # (score, nodes, principal variation) of the position after one root move. The worker's engine is cleared
+    # first, so the result does not depend on which worker ran the task or what it searched before.
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = Engine(WORKER_TABLE_SIZE)
+    else:
+        _worker_engine.clear()
+    result = _worker_engine.search(_load(fen, moves), depth)
+    return result.score, result.nodes, tuple(move.uci() for move in result.pv)
+
+
+def _executor(workers: Optional[int]) -> ProcessPoolExecutor:
+    # Spawned like the GUI's search worker, so the pool is safe to start from a process running Tk
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
+
+
+def parallel_perft_divide(board: Board, depth: int, workers: Optional[int] = None,
+                          executor: Optional[Executor] = None) -> Dict[str, int]:
+    # Board.perft_divide with the root moves split across worker processes; pass an executor to reuse its workers
+    if depth <= 1:
+        return {move.uci(): 1 for move in board.generate_legal_moves()} if depth == 1 else {}
+    own_executor = executor is None
+    if own_executor:
+        executor = _executor(workers)
+    try:
+        futures = {}
+        for move in board.generate_legal_moves():
+            board.perform_move(move)
+            futures[executor.submit(_perft_task, board.fen(), depth - 1)] = move.uci()
+            board.pop()
+        # Collect in root move order, as Board.perft_divide does
+        divide = {uci: future.result() for future, uci in futures.items()}
+    finally:
+        if own_executor:
+            executor.shutdown()
+    return divide
+
+
+def parallel_perft(board: Board, depth: int, workers: Optional[int] = None,
+                   executor: Optional[Executor] = None) -> int:
+    if depth <= 0:
+        return 1
+    return sum(parallel_perft_divide(board, depth, workers, executor).values())
+
+
+def _score_from_child(score: int) -> int:
+    # A child score negated to the root; mate distances grow by the root move
+    if score >= MATE_THRESHOLD:
+        return -(score - 1)
+    if score <= -MATE_THRESHOLD:
+        return -(score + 1)
+    return -score
+
+
+def parallel_search(board: Board, depth: int = DEFAULT_DEPTH, workers: Optional[int] = None,
+                    executor: Optional[Executor] = None) -> SearchResult:
+    # Root-split search: every root move is searched to depth - 1 by a worker with a full window, and the
+    # results are merged. Workers do not share bounds, so this searches more nodes than Engine.search to the same
+    # depth and pays off only with enough cores. A depth of 1 or less leaves nothing to split and is searched
+    # here to depth 1.
+    if depth <= 1:
+        return Engine(WORKER_TABLE_SIZE).search(board, 1)
+    start = time.perf_counter()
+    moves = board.generate_legal_moves()
+    if not moves:
+        return SearchResult(0, -MATE_SCORE if board.is_in_check() else 0, 1, time.perf_counter() - start, [])
+    own_executor = executor is None
+    if own_executor:
+        executor = _executor(workers)
+    try:
+        fen, history = _history(board)
+        futures = {executor.submit(_search_task, fen, history + (move.uci(),), depth - 1): move
+                   for move in moves}
+        best_score = -INFINITY
+        best_pv: List[Move] = []
+        nodes = 1
+        # Merging in root move order keeps the chosen move deterministic among equal scores
+        for future, move in futures.items():
+            score, child_nodes, pv = future.result()
+            nodes += child_nodes
+            score = _score_from_child(score)
+            if score > best_score:
+                best_score = score
+                best_pv = [move] + [Move.from_uci(uci) for uci in pv]
+    finally:
+        if own_executor:
+            executor.shutdown()
+    return SearchResult(depth, best_score, nodes, time.perf_counter() - start, best_pv)
+
+
+def report_scaling(depth: int, worker_counts: List[int], search: bool = False, out=sys.stdout):
+    # Time the perft suite (or a root-split search of each suite position) with every worker count and print
+    # speedup and efficiency relative to one worker. Pool start-up is excluded; each pool is warmed up first.
+    baseline = None
+    for workers in worker_counts:
+        with _executor(workers) as executor:
+            # Start every worker and load the package before timing
+            list(executor.map(_perft_task, [STARTING_FEN] * workers, [1] * workers))
+            nodes = 0
+            start = time.perf_counter()
+            for _, fen, expected in PERFT_SUITE:
+                board = Board(fen)
+                if search:
+                    nodes += parallel_search(board, depth, executor=executor).nodes
+                else:
+                    nodes += parallel_perft(board, min(depth, len(expected)), executor=executor)
+            elapsed = time.perf_counter() - start
+        if baseline is None:
+            # Single-worker time, extrapolated linearly if the first count is not 1
+            baseline = elapsed * workers
+        speedup = baseline / elapsed
+        print(f"workers {workers:>3}  nodes {nodes:>10}  {elapsed:8.3f}s  {nodes / max(elapsed, 1e-9):>10.0f} nps  "
+              f"speedup {speedup:5.2f}  efficiency {speedup / workers:6.1%}", file=out)
+        out.flush()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess.parallel",
+                                     description="Parallel perft and root-split search scaling report")
+    parser.add_argument("--depth", type=int, default=4, help="depth (default: 4)")
+    parser.add_argument("--workers", default=None,
+                        help="comma-separated worker counts (default: 1, 2, 4, ... up to the CPU count)")
+    parser.add_argument("--search", action="store_true", help="time root-split search instead of perft")
+    args = parser.parse_args(argv)
+
+    if args.workers:
+        try:
+            worker_counts = [int(count) for count in args.workers.split(",")]
+        except ValueError:
+            parser.error("--workers must be a comma-separated list of integers")
+    else:
+        worker_counts = []
+        count = 1
+        while count < (os.cpu_count() or 1):
+            worker_counts.append(count)
+            count *= 2
+        worker_counts.append(os.cpu_count() or 1)
+    print(f"{os.cpu_count()} CPUs")
+    report_scaling(args.depth, worker_counts, args.search)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import argparse
+import sys
+import time
+from typing import List, Tuple
+
+from .board import *
+
+# Standard perft positions: (name, FEN, node counts for depth 1, 2, ...)
+PERFT_SUITE: List[Tuple[str, str, List[int]]] = [
+    ("Start position", STARTING_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ("Kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("En passant", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("Promotion", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("Promotion and castling", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("Middlegame", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def run_suite(max_depth: int = 3, out=sys.stdout) -> bool:
+    # Check every suite position up to max_depth and report throughput; returns True if all counts match
+    board = Board()
+    total_nodes = 0
+    total_time = 0.0
+    passed = True
+    for name, fen, expected in PERFT_SUITE:
+        board.set_fen(fen)
+        depth = min(max_depth, len(expected))
+        start = time.perf_counter()
+        nodes = board.perft(depth)
+        elapsed = time.perf_counter() - start
+        total_nodes += nodes
+        total_time += elapsed
+        ok = nodes == expected[depth - 1]
+        passed = passed and ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<24} depth {depth}  nodes {nodes:>10}  "
+              f"expected {expected[depth - 1]:>10}  {elapsed:8.3f}s  {nodes / max(elapsed, 1e-9):>10.0f} nps", file=out)
+    print(f"total nodes {total_nodes}  time {total_time:.3f}s  {total_nodes / max(total_time, 1e-9):.0f} nps", file=out)
+    return passed
+
+
+def run_divide(fen: str, depth: int, out=sys.stdout) -> int:
+    board = Board()
+    board.set_fen(fen)
+    start = time.perf_counter()
+    divide = board.perft_divide(depth)
+    elapsed = time.perf_counter() - start
+    for uci, nodes in divide.items():
+        print(f"{uci}: {nodes}", file=out)
+    total = sum(divide.values())
+    print(f"\nmoves {len(divide)}  nodes {total}  {elapsed:.3f}s  {total / max(elapsed, 1e-9):.0f} nps", file=out)
+    return total
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess.perft", description="Verify and benchmark move generation")
+    parser.add_argument("--depth", type=int, default=3, help="maximum depth (default: 3)")
+    parser.add_argument("--fen", help="run a divide on this position instead of the suite")
+    args = parser.parse_args(argv)
+
+    if args.fen:
+        try:
+            run_divide(args.fen, args.depth)
+        except InvalidFenError as error:
+            parser.error(str(error))
+        return 0
+    return 0 if run_suite(args.depth) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
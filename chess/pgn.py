@@ -0,0 +1,195 @@
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from os import PathLike
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from .board import *
+
+REPLAY_CHUNK_SIZE = 64      # Games per task sent to a worker process
+
+_TAG_REGEX = re.compile(r'^\[\s*([A-Za-z0-9_+#=:-]+)\s+"((?:[^"\\]|\\.)*)"\s*\]\s*$')
+_TOKEN_REGEX = re.compile(r"""
+    (?P<comment>\{) | (?P<line_comment>;) | (?P<open>\() | (?P<close>\)) | (?P<nag>\$\d+) |
+    (?P<result>1-0|0-1|1/2-1/2|\*) | (?P<number>\d+\.+) | (?P<san>[^\s{}();$]+)
+    """, re.VERBOSE)
+
+
+@dataclass
+class Game:
+    headers: Dict[str, str] = field(default_factory=dict)   # Tag pairs in file order
+    moves: List[str] = field(default_factory=list)          # SAN of the mainline moves, annotations removed
+    result: str = "*"                                       # Game termination marker of the movetext
+
+    def board(self) -> Board:
+        # Starting position, from the FEN tag if there is one
+        fen = self.headers.get("FEN")
+        return Board(fen) if fen else Board()
+
+
+def read_pgn(source: str | PathLike | TextIO) -> Iterator[Game]:
+    # Stream the games of a PGN file one at a time, so archives of any size can be read. Comments, NAGs and
+    # variations are skipped; only the headers and the mainline SAN are kept.
+    if isinstance(source, (str, PathLike)):
+        with open(source, encoding="utf-8-sig") as file:
+            yield from read_pgn(file)
+        return
+
+    game = Game()
+    in_movetext = False     # Whether the current game's movetext has started
+    in_comment = False      # Inside a { } comment spanning lines
+    variation_depth = 0
+    for line in source:
+        if in_comment:
+            end = line.find('}')
+            if end < 0:
+                continue
+            in_comment = False
+            line = line[end + 1:]
+        elif line.startswith('%'):
+            # Escape mechanism: the whole line is ignored
+            continue
+        else:
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if stripped[0] == '[' and variation_depth == 0:
+                if in_movetext:
+                    # Headers of the next game; the previous one had no termination marker
+                    yield game
+                    game = Game()
+                    in_movetext = False
+                tag = _TAG_REGEX.match(stripped)
+                if tag:
+                    game.headers[tag.group(1)] = tag.group(2).replace('\\"', '"').replace('\\\\', '\\')
+                continue
+
+        in_movetext = True
+        position = 0
+        while True:
+            token = _TOKEN_REGEX.search(line, position)
+            if token is None:
+                break
+            position = token.end()
+            kind = token.lastgroup
+            if kind == "comment":
+                end = line.find('}', position)
+                if end < 0:
+                    in_comment = True
+                    break
+                position = end + 1
+            elif kind == "line_comment":
+                break
+            elif kind == "open":
+                variation_depth += 1
+            elif kind == "close":
+                variation_depth = max(variation_depth - 1, 0)
+            elif variation_depth:
+                continue
+            elif kind == "result":
+                game.result = token.group()
+                yield game
+                game = Game()
+                in_movetext = False
+            elif kind == "san":
+                game.moves.append(token.group().rstrip('!?'))
+    if in_movetext or game.headers:
+        yield game
+
+
+@dataclass(frozen=True)
+class GameReport:
+    index: int                      # Position of the game in the archive, from 0
+    plies: int                      # Moves replayed before the end of the game or the first error
+    fen: str                        # Final position, or the position where the first error occurred
+    outcome: Optional[Outcome]
+    result: str                     # Termination marker of the movetext
+    error: Optional[str] = None     # First legality or notation error, if any
+
+
+def replay_game(game: Game, index: int = 0) -> GameReport:
+    # Replay the mainline on a Board, stopping at the first move that cannot be played
+    try:
+        board = game.board()
+    except InvalidFenError as error:
+        return GameReport(index, 0, "", None, game.result, f"Invalid FEN tag: {error}")
+    for ply, san in enumerate(game.moves):
+        try:
+            move = board.parse_san(san)
+        except ValueError as error:
+            return GameReport(index, ply, board.fen(), None, game.result, f"Ply {ply + 1}: {error}")
+        board.perform_move(move)
+    return GameReport(index, len(game.moves), board.fen(), board.outcome(), game.result)
+
+
+def _replay_chunk(start: int, games: List[Tuple[Dict[str, str], List[str], str]]) -> List[GameReport]:
+    # Worker task: games arrive as plain tuples, which pickle smaller and faster than Game objects
+    return [replay_game(Game(headers, moves, result), start + offset)
+            for offset, (headers, moves, result) in enumerate(games)]
+
+
+def replay_games(games: Iterator[Game], workers: Optional[int] = None,
+                 chunk_size: int = REPLAY_CHUNK_SIZE) -> Iterator[GameReport]:
+    # Replay games in worker processes and yield their reports in archive order. Only a few chunks per worker
+    # are in flight at any time, so memory stays flat however many games the iterator produces. workers=0
+    # replays in this process.
+    if workers == 0:
+        for index, game in enumerate(games):
+            yield replay_game(game, index)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        max_pending = 2 * workers
+        pending = deque()
+        games = iter(games)
+        start = 0
+        while True:
+            while len(pending) < max_pending:
+                chunk = [(game.headers, game.moves, game.result) for game in islice(games, chunk_size)]
+                if not chunk:
+                    break
+                pending.append(executor.submit(_replay_chunk, start, chunk))
+                start += len(chunk)
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess.pgn", description="Replay and validate PGN archives")
+    parser.add_argument("files", nargs="+", help="PGN files")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU; 0 replays in this process)")
+    parser.add_argument("--verbose", action="store_true", help="print a line for every game, not only errors")
+    args = parser.parse_args(argv)
+
+    def all_games() -> Iterator[Game]:
+        for path in args.files:
+            yield from read_pgn(path)
+
+    games = errors = plies = 0
+    start = time.perf_counter()
+    for report in replay_games(all_games(), args.workers):
+        games += 1
+        plies += report.plies
+        if report.error:
+            errors += 1
+            print(f"game {report.index + 1}: {report.error}  [{report.fen}]")
+        elif args.verbose:
+            ending = report.outcome.termination.value if report.outcome else "unfinished"
+            print(f"game {report.index + 1}: {report.result} {ending}  {report.fen}")
+    elapsed = time.perf_counter() - start
+    print(f"games {games}  errors {errors}  plies {plies}  {elapsed:.2f}s  "
+          f"{games / max(elapsed, 1e-9):.0f} games/s  {plies / max(elapsed, 1e-9):.0f} plies/s", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,29 @@
 import chess
 
-from dataclasses import dataclass
-from typing import Self
+from typing import Dict, Self, Tuple
 
 from .constants import *
 
-@dataclass
+
 class Piece:
-    piece_type: PieceType
-    color: Color
+    # Immutable flyweight: Piece(piece_type, color) always returns the same object for the same arguments
+    __slots__ = ('piece_type', 'color')
+    _interned: Dict[Tuple[PieceType, Color], 'Piece'] = {}
+
+    def __new__(cls, piece_type: PieceType, color: Color) -> Self:
+        piece = cls._interned.get((piece_type, color))
+        if piece is None:
+            piece = object.__new__(cls)
+            object.__setattr__(piece, 'piece_type', piece_type)
+            object.__setattr__(piece, 'color', color)
+            cls._interned[(piece_type, color)] = piece
+        return piece
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Piece is immutable")
+
+    def __reduce__(self):
+        return Piece, (self.piece_type, self.color)
 
     def symbol(self):
         symbol = piece_symbol(self.piece_type)
@@ -16,12 +31,15 @@ class Piece:
 
     @classmethod
     def from_symbol(cls, symbol: str) -> Self:
-        if symbol == 0:
-            return cls(PieceType.EMPTY, Color.EMPTY)
+        if symbol == 0 or symbol == '_':
+            return EMPTY_PIECE
         return cls(PieceType(symbol.lower()), Color.WHITE if symbol.isupper() else Color.BLACK)
 
     def __str__(self):
         return self.symbol()
 
-    def __hash__(self):
-        return self.symbol().__hash__()
\ No newline at end of file
+    def __repr__(self):
+        return f"Piece(piece_type={self.piece_type!r}, color={self.color!r})"
+
+
+EMPTY_PIECE = Piece(PieceType.EMPTY, Color.EMPTY)
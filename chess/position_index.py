@@ -0,0 +1,267 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from os import PathLike
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .archive import *
+
+# An index file is a header, the result code of every game it covers, then one record per position of every game,
+# sorted by position hash, then game, then ply. The records are stored as four column arrays, so the hash
+# column can be binary-searched in place:
+#   keys: Board.zobrist_hash() of the position       games: game number in the archive
+#   plies: plies played before the position          moves: archive code of the move played next, or NO_NEXT_MOVE
+MAGIC = b"CHESSPI1"
+NO_NEXT_MOVE = 0xffff
+SHARD_GAMES = 20000     # Games per shard when building in parallel
+MERGE_BLOCK = 1 << 20   # Records per shard taken in each step of a merge
+
+_HEADER = np.dtype([("magic", "S8"), ("first_game", "<u8"), ("games", "<u8"), ("records", "<u8")])
+_COLUMNS = [("keys", np.dtype("<u8")), ("games", np.dtype("<u4")), ("plies", np.dtype("<u2")),
+            ("moves", np.dtype("<u2"))]
+
+
+def _results_size(games: int) -> int:
+    # The results are padded so the key column starts 8-byte aligned
+    return (games + 7) // 8 * 8
+
+
+def _create(path: str | PathLike, first_game: int, results: np.ndarray, records: int) -> List[np.ndarray]:
+    # Write the header and results of a new index file and return writable maps of its columns
+    header = np.zeros(1, dtype=_HEADER)
+    header[0] = (MAGIC, first_game, len(results), records)
+    with open(path, "wb") as file:
+        file.write(header.tobytes())
+        file.write(results.astype(np.uint8).tobytes().ljust(_results_size(len(results)), b"\0"))
+        file.truncate(_HEADER.itemsize + _results_size(len(results)) +
+                      records * sum(dtype.itemsize for _, dtype in _COLUMNS))
+    columns = []
+    offset = _HEADER.itemsize + _results_size(len(results))
+    for _, dtype in _COLUMNS:
+        columns.append(np.memmap(path, dtype=dtype, mode="r+", offset=offset, shape=(records,)) if records else
+                       np.zeros(0, dtype=dtype))
+        offset += records * dtype.itemsize
+    return columns
+
+
+@dataclass(frozen=True)
+class MoveStats:
+    move: Optional[Move]    # None counts the games that ended in the position
+    count: int
+    white_wins: int
+    draws: int
+    black_wins: int
+    unfinished: int
+
+
+@dataclass(frozen=True)
+class PositionMatches:
+    games: np.ndarray       # Numbers of the games reaching the position, ascending, each once
+    plies: np.ndarray       # Ply at which each of those games first reached it
+    moves: List[MoveStats]  # Moves played from the position, most played first
+
+    def __len__(self):
+        return len(self.games)
+
+
+class PositionIndex:
+    # Memory-mapped position index: a query is a binary search of the key column and a few vectorized passes over
+    # the matching records, however many games the index holds
+    def __init__(self, path: str | PathLike):
+        self.path = path
+        header = np.fromfile(path, dtype=_HEADER, count=1)
+        if len(header) != 1 or header[0]["magic"] != MAGIC:
+            raise ValueError(f"{path} is not a position index")
+        self.first_game = int(header[0]["first_game"])
+        self.game_count = int(header[0]["games"])
+        self.record_count = int(header[0]["records"])
+        self.results = np.memmap(path, dtype=np.uint8, mode="r", offset=_HEADER.itemsize, shape=(self.game_count,)) \
+            if self.game_count else np.zeros(0, dtype=np.uint8)
+        offset = _HEADER.itemsize + _results_size(self.game_count)
+        columns = []
+        for _, dtype in _COLUMNS:
+            columns.append(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(self.record_count,))
+                           if self.record_count else np.zeros(0, dtype=dtype))
+            offset += self.record_count * dtype.itemsize
+        self.keys, self.games, self.plies, self.moves = columns
+
+    def __len__(self):
+        return self.record_count
+
+    def _range(self, key: int) -> Tuple[int, int]:
+        key = np.uint64(key)
+        return int(np.searchsorted(self.keys, key, "left")), int(np.searchsorted(self.keys, key, "right"))
+
+    def query(self, position: Board | str) -> PositionMatches:
+        # Games reaching the position (a Board or a FEN) by any move order, with statistics of the moves played
+        # from it. Positions are matched by their 64-bit Zobrist hash.
+        board = Board(position) if isinstance(position, str) else position
+        start, stop = self._range(board.zobrist_hash())
+        games = np.asarray(self.games[start:stop])
+        # Records of a key are sorted by game and ply, so the first record of each game is its first visit
+        unique_games, first = np.unique(games, return_index=True)
+        plies = np.asarray(self.plies[start:stop])[first]
+
+        codes, move_index = np.unique(np.asarray(self.moves[start:stop]), return_inverse=True)
+        results = self.results[games - self.first_game].astype(np.intp)
+        table = np.bincount(move_index * 4 + results, minlength=4 * len(codes)).reshape(-1, 4)
+        moves = [MoveStats(None if code == NO_NEXT_MOVE else MOVES_BY_CODE[code], int(row.sum()),
+                           int(row[RESULTS.index("1-0")]), int(row[RESULTS.index("1/2-1/2")]),
+                           int(row[RESULTS.index("0-1")]), int(row[RESULTS.index("*")]))
+                 for code, row in zip(codes.tolist(), table)]
+        moves.sort(key=lambda stats: stats.count, reverse=True)
+        return PositionMatches(unique_games, plies, moves)
+
+
+def build_shard(archive_path: str | PathLike, path: str | PathLike, start: int = 0,
+                stop: Optional[int] = None) -> str | PathLike:
+    # Index games start..stop of an archive by replaying each once
+    keys, games, plies, moves = [], [], [], []
+    with GameArchive(archive_path) as archive:
+        stop = len(archive) if stop is None else min(stop, len(archive))
+        results = np.zeros(max(stop - start, 0), dtype=np.uint8)
+        board = Board()
+        for n in range(start, stop):
+            results[n - start] = RESULTS.index(archive.result(n))
+            archive.replay(n, board)
+            # Walk the game backwards from its final position, recording each position and the move played from it
+            next_code = NO_NEXT_MOVE
+            while True:
+                keys.append(board.zobrist_hash())
+                games.append(n)
+                plies.append(len(board.move_stack))
+                moves.append(next_code)
+                if not board.move_stack:
+                    break
+                next_code = MOVE_CODES[board.pop()]
+    columns = [np.array(keys, dtype=np.uint64), np.array(games, dtype=np.uint32), np.array(plies, dtype=np.uint16),
+               np.array(moves, dtype=np.uint16)]
+    order = np.lexsort((columns[2], columns[1], columns[0]))
+    for target, column in zip(_create(path, start, results, len(order)), columns):
+        target[:] = column[order]
+        if isinstance(target, np.memmap):
+            target.flush()
+    return path
+
+
+def merge_indexes(paths: Sequence[str | PathLike], path: str | PathLike, block: int = MERGE_BLOCK) -> str | PathLike:
+    # Merge indexes of consecutive game ranges (shards) into one. The sorted shards are merged block by block, so
+    # memory holds about block records per shard whatever the size of the index.
+    shards = sorted((PositionIndex(shard) for shard in paths), key=lambda shard: shard.first_game)
+    for previous, shard in zip(shards, shards[1:]):
+        if shard.first_game != previous.first_game + previous.game_count:
+            raise ValueError(f"{shard.path} does not continue the games of {previous.path}")
+    results = np.concatenate([np.asarray(shard.results) for shard in shards]) if shards else np.zeros(0, np.uint8)
+    total = sum(len(shard) for shard in shards)
+    outputs = _create(path, shards[0].first_game if shards else 0, results, total)
+    positions = [0] * len(shards)
+    written = 0
+    while written < total:
+        active = [i for i, shard in enumerate(shards) if positions[i] < len(shard)]
+        # Take every record below the smallest key any shard's next block ends with
+        cutoff = min(shards[i].keys[min(positions[i] + block, len(shards[i])) - 1] for i in active)
+        ranges = []
+        for i in active:
+            keys = shards[i].keys[positions[i]:positions[i] + block]
+            ranges.append((i, positions[i], positions[i] + int(np.searchsorted(keys, cutoff, "left"))))
+        if all(stop == start for _, start, stop in ranges):
+            # A block holds nothing but the cutoff key (a common position: one record per game). Its records come
+            # next in shard order, which is game order; copy them a block at a time so the run is never held whole.
+            for i in active:
+                keys = shards[i].keys
+                while positions[i] < len(keys) and keys[positions[i]] == cutoff:
+                    stop = positions[i] + int(np.searchsorted(keys[positions[i]:positions[i] + block], cutoff, "right"))
+                    for output, column in zip(outputs, (keys, shards[i].games, shards[i].plies, shards[i].moves)):
+                        output[written:written + stop - positions[i]] = column[positions[i]:stop]
+                    written += stop - positions[i]
+                    positions[i] = stop
+            continue
+        parts = [[np.asarray(column[start:stop]) for column in (shards[i].keys, shards[i].games, shards[i].plies,
+                                                                  shards[i].moves)] for i, start, stop in ranges]
+        merged = [np.concatenate(columns) for columns in zip(*parts)]
+        order = np.argsort(merged[0], kind="stable")
+        for output, column in zip(outputs, merged):
+            output[written:written + len(order)] = column[order]
+        written += len(order)
+        for i, start, stop in ranges:
+            positions[i] = stop
+    for output in outputs:
+        if isinstance(output, np.memmap):
+            output.flush()
+    return path
+
+
+def build_index(archive_path: str | PathLike, path: str | PathLike, workers: Optional[int] = None,
+                shard_games: int = SHARD_GAMES) -> str | PathLike:
+    # Index a whole archive: shards of shard_games games are built in worker processes, then merged.
+    # workers=0 builds in this process.
+    with GameArchive(archive_path) as archive:
+        games = len(archive)
+    ranges = [(start, min(start + shard_games, games)) for start in range(0, games, shard_games)] or [(0, 0)]
+    shard_paths = [f"{os.fspath(path)}.shard{i}" for i in range(len(ranges))]
+    try:
+        if workers == 0 or len(ranges) == 1:
+            for shard_path, (start, stop) in zip(shard_paths, ranges):
+                build_shard(archive_path, shard_path, start, stop)
+        else:
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = [executor.submit(build_shard, archive_path, shard_path, start, stop)
+                           for shard_path, (start, stop) in zip(shard_paths, ranges)]
+                for future in futures:
+                    future.result()
+        if len(shard_paths) == 1:
+            os.replace(shard_paths[0], path)
+        else:
+            merge_indexes(shard_paths, path)
+    finally:
+        for shard_path in shard_paths:
+            if os.path.exists(shard_path):
+                os.remove(shard_path)
+    return path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess.position_index",
+                                     description="Index the positions of a game archive and look them up")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="index every position of an archive")
+    build.add_argument("archive")
+    build.add_argument("index")
+    build.add_argument("--workers", type=int, default=None,
+                       help="worker processes (default: one per CPU; 0 builds in this process)")
+    build.add_argument("--shard-games", type=int, default=SHARD_GAMES, help="games per shard")
+    query = commands.add_parser("query", help="find the games reaching a position")
+    query.add_argument("index")
+    query.add_argument("fen", nargs="?", default=STARTING_FEN)
+    query.add_argument("--games", type=int, default=10, help="game numbers to print (default: 10)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.command == "build":
+        build_index(args.archive, args.index, args.workers, args.shard_games)
+        index = PositionIndex(args.index)
+        print(f"{index.game_count} games  {len(index)} positions  {time.perf_counter() - started:.2f}s",
+              file=sys.stderr)
+        return 0
+
+    matches = PositionIndex(args.index).query(args.fen)
+    elapsed = time.perf_counter() - started
+    print(f"{len(matches)} games")
+    for stats in matches.moves:
+        print(f"{stats.move.uci() if stats.move else 'end':<6} {stats.count:>8}  +{stats.white_wins} ={stats.draws} "
+              f"-{stats.black_wins} *{stats.unfinished}")
+    if len(matches):
+        print("games:", " ".join(str(game) for game in matches.games[:args.games]))
+    print(f"{elapsed * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
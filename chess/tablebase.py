@@ -0,0 +1,719 @@
+import argparse
+import mmap
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import combinations_with_replacement
+from os import PathLike
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .board import *
+
+TABLEBASE_PATH = os.environ.get("CHESS_TABLEBASE_PATH", "tablebases")     # Directory of default_tablebase()
+TABLE_SUFFIX = ".dtm"
+MAX_PIECES = 4
+GENERATION_CHUNK_SIZE = 1 << 20     # Positions decoded per vectorized step of the generator
+
+# A table holds one byte per position, all white-to-move positions first:
+DRAW = 0            # 1..127: the side to move mates in 2n - 1 plies
+LOSS_BASE = 128     # 128 + n: the side to move is mated in 2n plies
+ILLEGAL = 255
+
+_PIECE_ORDER = "KQRBNP"     # Order of the pieces of a side in table names, e.g. KRPvKB
+_LETTERS = "PNBRQK"         # By piece type
+_MATE = 1000    # Score of a position whose side to move mates in 0 plies: a win in n plies scores _MATE - n, a
+                # loss in n plies n - _MATE and a draw 0
+_NO_MOVE = -2 * _MATE   # Below every score: no move of the kind considered
+
+# Scores by table byte, for the side to move
+_SCORE_OF_BYTE = ([0] + [_MATE - (2 * n - 1) for n in range(1, LOSS_BASE)] +
+                  [2 * n - _MATE for n in range(ILLEGAL - LOSS_BASE)] + [0])
+
+
+def _side_letters(pieces: Iterable[int], color: int) -> str:
+    return "".join(sorted((_LETTERS[piece % 6] for piece in pieces if piece // 6 == color), key=_PIECE_ORDER.index))
+
+
+def _strength(side: str) -> tuple:
+    return len(side), [-_PIECE_ORDER.index(letter) for letter in side]
+
+
+def _canonical(white: str, black: str) -> Tuple[str, bool]:
+    # Name of the table holding a material balance, and whether it has the colors the other way round
+    if _strength(black) > _strength(white):
+        return f"{black}v{white}", True
+    return f"{white}v{black}", False
+
+
+def canonical_name(name: str) -> str:
+    # 'KRvKQ' -> 'KQvKR': the table name for a material balance given in any order
+    sides = name.upper().split("V")
+    if len(sides) != 2 or any(side.count("K") != 1 or set(side) - set(_PIECE_ORDER) for side in sides):
+        raise ValueError(f"Invalid material {name!r}, expected something like 'KQvKR'")
+    if sum(map(len, sides)) > MAX_PIECES:
+        raise ValueError(f"Tables have at most {MAX_PIECES} pieces: {name!r}")
+    white, black = ("".join(sorted(side, key=_PIECE_ORDER.index)) for side in sides)
+    return _canonical(white, black)[0]
+
+
+def table_names(max_pieces: int = 3) -> List[str]:
+    # Every table with 3 to max_pieces pieces, fewest pieces first
+    names = []
+    for count in range(1, max_pieces - 1):
+        for white_count in range(count, (count - 1) // 2, -1):
+            for white in combinations_with_replacement(_PIECE_ORDER[1:], white_count):
+                for black in combinations_with_replacement(_PIECE_ORDER[1:], count - white_count):
+                    name = _canonical("K" + "".join(white), "K" + "".join(black))[0]
+                    if name not in names:
+                        names.append(name)
+    return names
+
+
+def _dependencies(name: str) -> List[str]:
+    # Tables reached from name by a capture or a promotion
+    sides = name.split("v")
+    dependencies = []
+    for color, side in enumerate(sides):
+        for i, letter in enumerate(side[1:], 1):
+            rest = side[:i] + side[i + 1:]
+            changed = [rest] + ([rest + promotion for promotion in "QRBN"] if letter == "P" else [])
+            for new_side in changed:
+                new_side = "".join(sorted(new_side, key=_PIECE_ORDER.index))
+                white, black = (new_side, sides[1]) if color == WHITE else (sides[0], new_side)
+                dependency = _canonical(white, black)[0]
+                if dependency != "KvK" and dependency not in dependencies:
+                    dependencies.append(dependency)
+    return dependencies
+
+
+class _Material:
+    # Pieces and index arithmetic of one table. The pieces, as Board.bitboards indices, are the white king, the
+    # black king, then the other white and black pieces in name order. Mirroring the board keeps the white king
+    # on files a-d, and also on ranks 1-4 when there are no pawns, so a table has
+    # 2 * 32 * 64^(pieces - 1) positions (2 * 16 * ... without pawns).
+    def __init__(self, name: str):
+        white, black = name.split("v")
+        self.name = name
+        self.pieces = ([KING, 6 + KING] + [_LETTERS.index(letter) for letter in white[1:]] +
+                       [6 + _LETTERS.index(letter) for letter in black[1:]])
+        self.has_pawns = "P" in name
+        self.king_squares = [index for index in range(64) if index & 7 < 4 and (self.has_pawns or index >> 3 < 4)]
+        self.king_slots = [-1] * 64
+        for slot, index in enumerate(self.king_squares):
+            self.king_slots[index] = slot
+        self.half = len(self.king_squares) * 64 ** (len(self.pieces) - 1)     # Positions per side to move
+        self.size = 2 * self.half
+        self._king_square_array = np.array(self.king_squares, dtype=np.int64)
+        self._king_slot_array = np.array(self.king_slots, dtype=np.int64)
+
+    def index(self, turn: int, squares: List[int]) -> int:
+        # Position of the pieces on squares (in self.pieces order) with turn (WHITE or BLACK) to move
+        flip = 7 if squares[0] & 7 > 3 else 0
+        if not self.has_pawns and squares[0] > 31:
+            flip |= 56
+        index = self.king_slots[squares[0] ^ flip]
+        for square in squares[1:]:
+            index = index * 64 + (square ^ flip)
+        return turn * self.half + index
+
+    def encode(self, turn: int, squares: List[np.ndarray]) -> np.ndarray:
+        # index() for arrays of positions
+        flip = np.where(squares[0] & 7 > 3, 7, 0)
+        if not self.has_pawns:
+            flip |= np.where(squares[0] > 31, 56, 0)
+        index = self._king_slot_array[squares[0] ^ flip]
+        for square in squares[1:]:
+            index = index * 64 + (square ^ flip)
+        return index + turn * self.half
+
+    def decode(self, indices: np.ndarray, turn: int) -> List[np.ndarray]:
+        # Squares of the pieces of positions with turn to move
+        index = indices - turn * self.half
+        squares = []
+        for _ in self.pieces[1:]:
+            squares.append(index & 63)
+            index = index >> 6
+        squares.append(self._king_square_array[index])
+        squares.reverse()
+        return squares
+
+
+class Tablebase:
+    # The tables of a directory, memory-mapped on first use. A probe is a constant-time index computation and
+    # one byte read; tables that are missing make the positions they would cover unknown (None).
+    def __init__(self, directory: str | PathLike):
+        self.directory = directory
+        self._tables: Dict[str, Optional[Tuple[_Material, mmap.mmap]]] = {}
+
+    def close(self):
+        for table in self._tables.values():
+            if table is not None:
+                table[1].close()
+        self._tables.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _table(self, name: str) -> Optional[Tuple[_Material, mmap.mmap]]:
+        if name not in self._tables:
+            path = os.path.join(self.directory, name + TABLE_SUFFIX)
+            try:
+                with open(path, "rb") as file:
+                    data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (FileNotFoundError, ValueError):
+                self._tables[name] = None
+                return None
+            material = _Material(name)
+            if len(data) != material.size:
+                data.close()
+                raise ValueError(f"{path} has {len(data)} bytes, a {name} table has {material.size}")
+            self._tables[name] = material, data
+        return self._tables[name]
+
+    def _score(self, board: Board) -> Optional[int]:
+        # Score of the position for the side to move, None if no table covers it
+        if board.castling_rights or popcount(board.occupied) > MAX_PIECES:
+            return None
+        us = WHITE if board.turn is Color.WHITE else BLACK
+        if board.ep_square is not None and PAWN_ATTACKS[us ^ 1][board.ep_square.index] & board.bitboards[us * 6 + PAWN]:
+            # The tables assume no en passant right, so look one move ahead
+            return self._search(board)
+        pieces = [piece for piece in range(12) for _ in range(popcount(board.bitboards[piece]))]
+        name, swapped = _canonical(_side_letters(pieces, WHITE), _side_letters(pieces, BLACK))
+        if name == "KvK":
+            return 0
+        table = self._table(name)
+        if table is None:
+            return None
+        material, data = table
+        # Take the squares in table piece order, with the colors exchanged and the board flipped if the table
+        # has the material the other way round
+        remaining = list(board.bitboards)
+        squares = []
+        for piece in material.pieces:
+            if swapped:
+                piece = piece + 6 if piece < 6 else piece - 6
+            bb = remaining[piece]
+            remaining[piece] = bb & (bb - 1)
+            squares.append(lsb(bb) ^ 56 if swapped else lsb(bb))
+        byte = data[material.index(us ^ swapped, squares)]
+        return None if byte == ILLEGAL else _SCORE_OF_BYTE[byte]
+
+    def _search(self, board: Board) -> Optional[int]:
+        best = _NO_MOVE
+        for move in list(board.legal_moves):
+            board.perform_move(move)
+            score = self._score(board)
+            board.pop()
+            if score is None:
+                return None
+            best = max(best, -score - (score < 0) + (score > 0))
+        if best == _NO_MOVE:
+            return -_MATE if board.is_in_check() else 0
+        return best
+
+    def probe_dtm(self, board: Board) -> Optional[int]:
+        # Plies to mate with best play: positive if the side to move mates, negative if it gets mated, 0 for a
+        # draw or a side already checkmated; None if the position is not in the tables
+        score = self._score(board)
+        if score is None:
+            return None
+        return _MATE - score if score > 0 else -(_MATE + score) if score < 0 else 0
+
+    def probe_wdl(self, board: Board) -> Optional[int]:
+        # 1 if the side to move wins, 0 for a draw, -1 if it loses; None if the position is not in the tables
+        score = self._score(board)
+        return None if score is None else (score > 0) - (score < 0)
+
+
+_default_tablebase: Optional[Tablebase] = None
+
+
+def open_tablebase(directory: str | PathLike) -> Tablebase:
+    return Tablebase(directory)
+
+
+def default_tablebase() -> Tablebase:
+    # The tables of TABLEBASE_PATH, used by Board.probe_wdl and Board.probe_dtm
+    global _default_tablebase
+    if _default_tablebase is None:
+        _default_tablebase = Tablebase(TABLEBASE_PATH)
+    return _default_tablebase
+
+
+# Generation
+
+_BITS = np.array(BB_SQUARES, dtype=np.uint64)
+_BETWEEN = np.array(BB_BETWEEN, dtype=np.uint64)
+_SLIDERS = (BISHOP, ROOK, QUEEN)
+# _EMPTY_ATTACKS[piece_type][square] are the squares attacked on an empty board; pawns by _PAWN_ATTACKS[color]
+_EMPTY_ATTACKS = [None] + [np.array(attacks, dtype=np.uint64) for attacks in (
+    KNIGHT_ATTACKS, [bishop_attacks(i, BB_EMPTY) for i in range(64)], [rook_attacks(i, BB_EMPTY) for i in range(64)],
+    [queen_attacks(i, BB_EMPTY) for i in range(64)], KING_ATTACKS)]
+_PAWN_ATTACKS = [np.array(PAWN_ATTACKS[color], dtype=np.uint64) for color in (WHITE, BLACK)]
+
+
+def _target_slots(attacks: List[int]) -> np.ndarray:
+    # slots[k][square] is the k-th attacked square from square, or -1
+    targets = [list(scan_forward(bb)) for bb in attacks]
+    slots = np.full((max(map(len, targets)), 64), -1, dtype=np.int64)
+    for index, squares in enumerate(targets):
+        slots[:len(squares), index] = squares
+    return slots
+
+
+_TARGET_SLOTS = [None] + [_target_slots([int(bb) for bb in attacks]) for attacks in _EMPTY_ATTACKS[1:]]
+_PAWN_CAPTURE_SLOTS = [_target_slots(PAWN_ATTACKS[color]) for color in (WHITE, BLACK)]
+_BYTE_SCORES = np.array(_SCORE_OF_BYTE, dtype=np.int16)
+
+_UNKNOWN, _WON, _LOST, _DRAWN, _ILLEGAL = range(5)
+_NEVER = np.iinfo(np.int16).max
+
+
+def _occupancy(squares: List[np.ndarray]) -> np.ndarray:
+    occupied = np.zeros(len(squares[0]), dtype=np.uint64)
+    for square in squares:
+        occupied |= _BITS[square]
+    return occupied
+
+
+def _attacked(targets: np.ndarray, attackers: List[Tuple[int, np.ndarray]], occupied: np.ndarray) -> np.ndarray:
+    # Whether each target square is attacked by one of the (Board.bitboards index, squares) pieces
+    attacked = np.zeros(len(targets), dtype=bool)
+    bits = _BITS[targets]
+    for piece, squares in attackers:
+        piece_type = piece % 6
+        table = _PAWN_ATTACKS[piece // 6] if piece_type == PAWN else _EMPTY_ATTACKS[piece_type]
+        hits = (table[squares] & bits) != 0
+        if piece_type in _SLIDERS:
+            hits &= (_BETWEEN[squares, targets] & occupied) == 0
+        attacked |= hits
+    return attacked
+
+
+def _piece_targets(piece_type: int, squares: np.ndarray,
+                   occupied: np.ndarray) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    # (target squares, reachable) for each slot of a knight, bishop, rook, queen or king; a slider is only
+    # reachable along a clear path, whatever stands on the target square itself
+    for slot in _TARGET_SLOTS[piece_type]:
+        targets = slot[squares]
+        reachable = targets >= 0
+        targets = np.maximum(targets, 0)
+        if piece_type in _SLIDERS:
+            reachable &= (_BETWEEN[squares, targets] & occupied) == 0
+        yield targets, reachable
+
+
+def _adjust(scores: np.ndarray) -> np.ndarray:
+    # Score one ply earlier: the negated score of the position after a move, one ply further from mate
+    return -scores + np.sign(scores).astype(np.int16)
+
+
+@dataclass(frozen=True)
+class TableStats:
+    name: str
+    positions: int      # Legal positions, both sides to move
+    wins: int           # Positions the side to move wins
+    draws: int
+    losses: int
+    longest: int        # Longest forced mate in plies
+    seconds: float
+
+    def __str__(self):
+        return (f"{self.name:<8} {self.positions:>10} positions  {self.wins:>10} wins  {self.draws:>10} draws  "
+                f"{self.losses:>10} losses  longest mate {self.longest:>3} plies  {self.seconds:.1f}s")
+
+
+class _Generator:
+    # Retrograde analysis of one table, vectorized over arrays of positions.
+    #
+    # Every position counts its legal moves that stay in the table. Captures and promotions leave it, and their
+    # scores are read from the smaller tables (and those with the promoted piece) when the table is set up. Then,
+    # ply by ply, the positions lost in n plies make their predecessors won in n + 1, and every position won in
+    # n + 1 takes one off the move count of its predecessors: a position whose count reaches zero, and whose
+    # captures and promotions lose as well, is lost in n + 2 (or later, if a capture takes longer to lose).
+    # Whatever is unresolved at the end is drawn.
+    #
+    # The tables have no en passant rights. A double pawn push that allows an en passant capture leads to a
+    # position that is at least as good for the opponent as the capture: pushes where the capture wins count as
+    # lost once either the position or the capture is (a timed decrement), pushes where it draws never count
+    # as wins, and pushes where it loses win no sooner than the capture loses.
+    def __init__(self, name: str, directory: str | PathLike):
+        self.material = _Material(name)
+        self.directory = directory
+        self._tables: Dict[str, Tuple[_Material, np.ndarray]] = {}
+        size = self.material.size
+        self.valid = np.zeros(size, dtype=bool)
+        self.count = np.zeros(size, dtype=np.uint8)     # Legal moves that stay in the table and are not known to lose
+        self.best_exit = np.full(size, _NO_MOVE, dtype=np.int16)    # Best score of a capture or promotion
+        self.state = np.full(size, _UNKNOWN, dtype=np.int8)
+        self.distance = np.zeros(size, dtype=np.uint8)  # Plies to mate of won and lost positions
+        self.lose_at = np.full(size, _NEVER, dtype=np.int16)    # Ply at which a position will be known lost
+        self.win_at = np.full(size, _NEVER, dtype=np.int16)     # Ply at which a position will be known won
+        self.horizon = 0    # Highest ply set in lose_at or win_at
+        # (ply, position, successor) of double pushes whose en passant capture wins for the opponent: the
+        # position loses a move at that ply unless the successor was won by then
+        self._timed: List[np.ndarray] = []
+
+    def _sub_table(self, name: str) -> Tuple[_Material, np.ndarray]:
+        if name not in self._tables:
+            material = _Material(name)
+            path = os.path.join(self.directory, name + TABLE_SUFFIX)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"{self.material.name} needs the {name} table, which is not in {self.directory}")
+            self._tables[name] = material, np.memmap(path, dtype=np.uint8, mode="r", shape=(material.size,))
+        return self._tables[name]
+
+    def _scores(self, pieces: List[int], squares: List[np.ndarray], turn: int) -> np.ndarray:
+        # Scores, for the side to move, of positions of another material
+        name, swapped = _canonical(_side_letters(pieces, WHITE), _side_letters(pieces, BLACK))
+        if name == "KvK":
+            return np.zeros(len(squares[0]), dtype=np.int16)
+        material, table = self._sub_table(name)
+        if swapped:
+            pieces = [piece + 6 if piece < 6 else piece - 6 for piece in pieces]
+            squares = [square ^ 56 for square in squares]
+            turn ^= 1
+        available = list(range(len(pieces)))
+        ordered = []
+        for piece in material.pieces:
+            i = next(i for i in available if pieces[i] == piece)
+            available.remove(i)
+            ordered.append(squares[i])
+        return _BYTE_SCORES[table[material.encode(turn, ordered)]]
+
+    def _en_passant_scores(self, turn: int, squares: List[np.ndarray], occupied: np.ndarray, j: int) -> np.ndarray:
+        # Best score of an en passant capture for turn, after the pawn j of the other side pushed two squares
+        pieces = self.material.pieces
+        pawn = squares[j]
+        passed = pawn - 8 if pieces[j] < 6 else pawn + 8
+        scores = np.full(len(pawn), _NO_MOVE, dtype=np.int16)
+        for e, piece in enumerate(pieces):
+            if piece != turn * 6 + PAWN:
+                continue
+            rows = np.flatnonzero((squares[e] >> 3 == pawn >> 3) & (np.abs((squares[e] & 7) - (pawn & 7)) == 1))
+            if not rows.size:
+                continue
+            new = [square[rows] for square in squares]
+            new[e] = passed[rows]
+            occupied_after = occupied[rows] ^ _BITS[pawn[rows]] ^ _BITS[squares[e][rows]] | _BITS[passed[rows]]
+            rest = [i for i in range(len(pieces)) if i != j]
+            legal = ~_attacked(new[turn], [(pieces[i], new[i]) for i in rest if pieces[i] // 6 != turn],
+                               occupied_after)
+            after = self._scores([pieces[i] for i in rest], [new[i] for i in rest], turn ^ 1)
+            scores[rows] = np.maximum(scores[rows], np.where(legal, _adjust(after), _NO_MOVE))
+        return scores
+
+    def _validate(self, start: int, stop: int, turn: int):
+        # Legal positions: no two pieces on a square, no pawn on the first or last rank, side not to move not
+        # in check (which also keeps the kings apart)
+        pieces = self.material.pieces
+        squares = self.material.decode(np.arange(start, stop, dtype=np.int64), turn)
+        valid = np.ones(stop - start, dtype=bool)
+        for a in range(len(squares)):
+            for b in range(a):
+                valid &= squares[a] != squares[b]
+            if pieces[a] % 6 == PAWN:
+                valid &= (squares[a] >> 3 != 0) & (squares[a] >> 3 != 7)
+        attackers = [(piece, square) for piece, square in zip(pieces, squares) if piece // 6 == turn]
+        valid &= ~_attacked(squares[turn ^ 1], attackers, _occupancy(squares))
+        self.valid[start:stop] = valid
+
+    def _forward(self, start: int, stop: int, turn: int):
+        # Count the moves that stay in the table and score the captures and promotions of a range of positions
+        material = self.material
+        pieces = material.pieces
+        positions = start + np.flatnonzero(self.valid[start:stop])
+        squares = material.decode(positions, turn)
+        occupied = _occupancy(squares)
+        count = np.zeros(len(positions), dtype=np.uint8)
+        best = np.full(len(positions), _NO_MOVE, dtype=np.int16)
+        last_rank = 7 if turn == WHITE else 0
+
+        def play(j: int, targets: np.ndarray, reachable: np.ndarray, quiet_only: bool = False,
+                 captures_only: bool = False, double_push: bool = False):
+            piece = pieces[j]
+            promotions = ([turn * 6 + piece_type for piece_type in (QUEEN, ROOK, BISHOP, KNIGHT)]
+                          if piece % 6 == PAWN else [])
+            captures = [] if quiet_only else [e for e, enemy in enumerate(pieces) if enemy // 6 != turn and
+                                                                                   enemy % 6 != KING]
+            for e in [None] + captures:
+                if e is None:
+                    if captures_only:
+                        continue
+                    rows = np.flatnonzero(reachable & ((occupied & _BITS[targets]) == 0))
+                else:
+                    rows = np.flatnonzero(reachable & (squares[e] == targets))
+                if not rows.size:
+                    continue
+                new = [square[rows] for square in squares]
+                new[j] = targets[rows]
+                occupied_after = occupied[rows] ^ _BITS[squares[j][rows]] | _BITS[new[j]]
+                promoting = (new[j] >> 3 == last_rank) if promotions else np.zeros(len(rows), dtype=bool)
+                if e is None:
+                    # Quiet moves stay in the table: legal if the position after it is
+                    moves = np.flatnonzero(~promoting)
+                    successors = material.encode(turn ^ 1, [square[moves] for square in new])
+                    legal = self.valid[successors]
+                    if double_push:
+                        en_passant = self._en_passant_scores(turn ^ 1, [square[moves] for square in new],
+                                                             occupied_after[moves], j)
+                        losing = np.flatnonzero(legal & (en_passant > 0))
+                        if losing.size:
+                            self._timed.append(np.stack([_MATE - 1 - en_passant[losing].astype(np.int64),
+                                                         positions[rows[moves[losing]]], successors[losing]]))
+                    count[rows[moves]] += legal.astype(np.uint8)
+                    if not promoting.any():
+                        continue
+                rest = [i for i in range(len(pieces)) if i != e]
+                king = j if piece % 6 == KING else turn
+                legal = ~_attacked(new[king], [(pieces[i], new[i]) for i in rest if pieces[i] // 6 != turn],
+                                   occupied_after)
+                for new_piece, group in ([(piece, ~promoting)] if e is not None else []) + \
+                                        [(promotion, promoting) for promotion in promotions]:
+                    group = np.flatnonzero(group & legal)
+                    if not group.size:
+                        continue
+                    after = self._scores([new_piece if i == j else pieces[i] for i in rest],
+                                         [new[i][group] for i in rest], turn ^ 1)
+                    best[rows[group]] = np.maximum(best[rows[group]], _adjust(after))
+
+        for j, piece in enumerate(pieces):
+            if piece // 6 != turn:
+                continue
+            if piece % 6 != PAWN:
+                for targets, reachable in _piece_targets(piece % 6, squares[j], occupied):
+                    play(j, targets, reachable)
+                continue
+            forward = 8 if turn == WHITE else -8
+            single = squares[j] + forward
+            free = (occupied & _BITS[single]) == 0
+            play(j, single, free, quiet_only=True)
+            start_rank = 1 if turn == WHITE else 6
+            double = np.where(squares[j] >> 3 == start_rank, single + forward, single)
+            play(j, double, free & (squares[j] >> 3 == start_rank), quiet_only=True, double_push=True)
+            for slot in _PAWN_CAPTURE_SLOTS[turn]:
+                targets = slot[squares[j]]
+                play(j, np.maximum(targets, 0), targets >= 0, captures_only=True)
+
+        self.count[positions] = count
+        self.best_exit[positions] = best
+        no_moves = np.flatnonzero((count == 0) & (best == _NO_MOVE))
+        in_check = _attacked(squares[turn][no_moves],
+                             [(piece, square[no_moves]) for piece, square in zip(pieces, squares) if piece // 6 != turn],
+                             occupied[no_moves])
+        self.lose_at[positions[no_moves[in_check]]] = 0
+        self.state[positions[no_moves[~in_check]]] = _DRAWN
+        # Only captures and promotions, all losing: lost once the slowest of them is
+        exits_only = np.flatnonzero((count == 0) & (best < 0) & (best > _NO_MOVE))
+        self.lose_at[positions[exits_only]] = best[exits_only] + _MATE
+        # Captures and promotions that win
+        winning = np.flatnonzero(best > 0)
+        self.win_at[positions[winning]] = _MATE - best[winning]
+
+    def _predecessors(self, positions: np.ndarray) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray]]]:
+        # Positions one quiet move before positions, in batches, with the en passant scores of the side to move
+        # in positions when the move was a double pawn push
+        material = self.material
+        pieces = material.pieces
+        for turn in (WHITE, BLACK):
+            batch = positions[(positions >= material.half) == (turn == BLACK)]
+            if not batch.size:
+                continue
+            squares = material.decode(batch, turn)
+            occupied = _occupancy(squares)
+            mover = turn ^ 1
+
+            def unmove(j: int, origins: np.ndarray, reachable: np.ndarray, double_push: bool = False):
+                rows = np.flatnonzero(reachable & ((occupied & _BITS[origins]) == 0))
+                new = [square[rows] for square in squares]
+                new[j] = origins[rows]
+                predecessors = material.encode(mover, new)
+                legal = self.valid[predecessors]
+                en_passant = None
+                if double_push:
+                    en_passant = self._en_passant_scores(turn, [square[rows] for square in squares],
+                                                         occupied[rows], j)[legal]
+                return predecessors[legal], en_passant
+
+            for j, piece in enumerate(pieces):
+                if piece // 6 != mover:
+                    continue
+                if piece % 6 != PAWN:
+                    for origins, reachable in _piece_targets(piece % 6, squares[j], occupied):
+                        yield unmove(j, origins, reachable)
+                    continue
+                backward = -8 if mover == WHITE else 8
+                rank = squares[j] >> 3
+                single = np.clip(squares[j] + backward, 0, 63)
+                # A pawn on its second rank has not moved; one on its fourth may have come from the second
+                free = (rank != (1 if mover == WHITE else 6)) & ((occupied & _BITS[single]) == 0)
+                yield unmove(j, single, free)
+                double = np.clip(single + backward, 0, 63)
+                yield unmove(j, double, free & (rank == (3 if mover == WHITE else 4)), double_push=True)
+
+    def _decrement(self, predecessors: np.ndarray, ply: int):
+        # One move of each predecessor turned out to lose in ply + 1: those without another move are lost
+        count, best_exit = self.count, self.best_exit
+        predecessors = predecessors[self.state[predecessors] == _UNKNOWN]
+        np.subtract.at(count, predecessors, 1)
+        lost_later = np.unique(predecessors[count[predecessors] == 0])
+        lost_later = lost_later[best_exit[lost_later] < 0]
+        if lost_later.size:
+            exits = best_exit[lost_later]
+            self.lose_at[lost_later] = np.maximum(np.where(exits > _NO_MOVE, exits + _MATE, 0), ply + 2)
+            self.horizon = max(self.horizon, int(self.lose_at[lost_later].max()))
+
+    def _retrograde(self):
+        state, lose_at, win_at = self.state, self.lose_at, self.win_at
+        timed = np.concatenate(self._timed, axis=1) if self._timed else np.zeros((3, 0), dtype=np.int64)
+        self.horizon = max(self.horizon, int(timed[0].max(initial=-1)) + 2)
+        ply = 0
+        while True:
+            lost = np.flatnonzero((lose_at == ply) & (state == _UNKNOWN))
+            state[lost] = _LOST
+            self.distance[lost] = ply
+            winners = [np.flatnonzero((win_at == ply + 1) & (state == _UNKNOWN))]
+            for predecessors, en_passant in self._predecessors(lost):
+                if en_passant is not None:
+                    capture_loses = (en_passant < 0) & (en_passant > _NO_MOVE)
+                    # The position after the push is lost only once the en passant capture is
+                    later = capture_loses & (en_passant + _MATE > ply)
+                    if later.any():
+                        np.minimum.at(win_at, predecessors[later], (en_passant[later] + _MATE + 1).astype(np.int16))
+                        self.horizon = max(self.horizon, int(en_passant[later].max()) + _MATE + 1)
+                    predecessors = predecessors[(en_passant == _NO_MOVE) | (capture_loses & ~later)]
+                winners.append(predecessors)
+            won = np.unique(np.concatenate(winners))
+            won = won[state[won] == _UNKNOWN]
+            state[won] = _WON
+            self.distance[won] = ply + 1
+            for predecessors, en_passant in self._predecessors(won):
+                if en_passant is not None:
+                    # Pushes whose en passant capture wins sooner are taken off by their timed decrement
+                    predecessors = predecessors[(en_passant <= 0) | (ply + 1 <= _MATE - en_passant)]
+                self._decrement(predecessors, ply)
+            due = timed[:, timed[0] == ply]
+            if due.size:
+                successors = due[2]
+                self._decrement(due[1][(state[successors] != _WON) | (self.distance[successors] > ply + 1)], ply)
+            if not lost.size and not won.size and ply >= self.horizon:
+                break
+            ply += 1
+            if ply > 2 * (LOSS_BASE - 2):
+                raise ValueError(f"{self.material.name}: mates longer than a table byte can hold")
+
+    def generate(self) -> Tuple[np.ndarray, TableStats]:
+        started = time.perf_counter()
+        material = self.material
+        chunk = min(material.half, GENERATION_CHUNK_SIZE)
+        ranges = [(start, start + chunk, turn) for turn in (WHITE, BLACK)
+                  for start in range(turn * material.half, (turn + 1) * material.half, chunk)]
+        for start, stop, turn in ranges:
+            self._validate(start, stop, turn)
+        for start, stop, turn in ranges:
+            self._forward(start, stop, turn)
+        self.state[~self.valid] = _ILLEGAL
+        finite = np.concatenate([self.lose_at[self.lose_at < _NEVER], self.win_at[self.win_at < _NEVER]])
+        self.horizon = int(finite.max(initial=0))
+        self._retrograde()
+
+        table = np.full(material.size, DRAW, dtype=np.uint8)
+        table[self.state == _ILLEGAL] = ILLEGAL
+        won = self.state == _WON
+        lost = self.state == _LOST
+        table[won] = (self.distance[won] + 1) // 2
+        table[lost] = LOSS_BASE + self.distance[lost] // 2
+        wins, losses = int(won.sum()), int(lost.sum())
+        positions = int(self.valid.sum())
+        stats = TableStats(material.name, positions, wins, positions - wins - losses, losses,
+                           int(self.distance[won | lost].max(initial=0)), time.perf_counter() - started)
+        return table, stats
+
+
+def generate_table(name: str, directory: str | PathLike) -> TableStats:
+    # Generate one table into directory, which must hold the tables it depends on. The file is written under a
+    # temporary name and renamed, so a table that exists is always complete.
+    name = canonical_name(name)
+    table, stats = _Generator(name, directory).generate()
+    path = os.path.join(directory, name + TABLE_SUFFIX)
+    table.tofile(path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return stats
+
+
+def generate_tablebases(directory: str | PathLike, names: Optional[Iterable[str]] = None, max_pieces: int = 3,
+                        workers: Optional[int] = None) -> Iterator[TableStats]:
+    # Generate the tables named (default: all with up to max_pieces pieces) and the tables they depend on, in
+    # worker processes: each table is started as soon as its captures and promotions are done. Tables already in
+    # directory are kept. workers=0 generates in this process.
+    os.makedirs(directory, exist_ok=True)
+    pending = set()
+    stack = [canonical_name(name) for name in names] if names else table_names(max_pieces)
+    while stack:
+        name = stack.pop()
+        if name not in pending:
+            pending.add(name)
+            stack.extend(_dependencies(name))
+    done = {name for name in pending if os.path.exists(os.path.join(directory, name + TABLE_SUFFIX))}
+    pending -= done
+
+    def ready() -> List[str]:
+        return sorted((name for name in pending if all(dependency in done for dependency in _dependencies(name))),
+                      key=lambda name: (len(name), name))
+
+    if workers == 0:
+        while pending:
+            name = ready()[0]
+            yield generate_table(name, directory)
+            pending.remove(name)
+            done.add(name)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        running = {}
+        while pending or running:
+            for name in ready():
+                running[executor.submit(generate_table, name, directory)] = name
+                pending.remove(name)
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done.add(running.pop(future))
+                yield future.result()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess.tablebase",
+                                     description="Generate and probe endgame tablebases")
+    parser.add_argument("directory", nargs="?", default=TABLEBASE_PATH, help=f"table directory (default: {TABLEBASE_PATH})")
+    parser.add_argument("--tables", nargs="+", help="tables to generate, e.g. KQvKR (default: all up to --pieces)")
+    parser.add_argument("--pieces", type=int, default=3, choices=range(3, MAX_PIECES + 1),
+                        help="generate every table with up to this many pieces (default: 3)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU; 0 generates in this process)")
+    parser.add_argument("--probe", metavar="FEN", action="append", help="probe a position instead of generating")
+    args = parser.parse_args(argv)
+
+    if args.probe:
+        with open_tablebase(args.directory) as tablebase:
+            for fen in args.probe:
+                board = Board(fen)
+                print(f"{fen}  wdl {tablebase.probe_wdl(board)}  dtm {tablebase.probe_dtm(board)}")
+        return 0
+    started = time.perf_counter()
+    for stats in generate_tablebases(args.directory, args.tables, args.pieces, args.workers):
+        print(stats)
+    print(f"done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
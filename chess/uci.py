@@ -0,0 +1,171 @@
+import sys
+import threading
+from typing import List, Optional, TextIO
+
+from .board import *
+from .engine import *
+
+ENGINE_NAME = "chess-gui-impl"
+MOVE_OVERHEAD = 0.05        # Seconds kept back per move for communication delays
+DEFAULT_MOVES_TO_GO = 30    # Moves the remaining clock time is spread over when the GUI does not say
+
+
+class UciEngine:
+    # UCI protocol front-end. Commands are handled on the calling thread while searches run on their own thread,
+    # so 'stop', 'isready' and 'quit' are answered immediately even in the middle of a search.
+    def __init__(self, output: TextIO = sys.stdout):
+        self.output = output
+        self.engine = Engine()
+        self.board = Board()
+        self.base_fen = STARTING_FEN    # Position the moves of the last 'position' command start from
+        self._output_lock = threading.Lock()
+        self._search_thread: Optional[threading.Thread] = None
+        self._stop_requested = threading.Event()
+
+    def send(self, line: str):
+        with self._output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def run(self, source: TextIO = sys.stdin):
+        for line in source:
+            if not self.handle(line):
+                break
+        self.stop()
+
+    def handle(self, line: str) -> bool:
+        # Handle one command line; returns False on 'quit'
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, arguments = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send("id author chess-gui-impl authors")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stop()
+            self.engine.clear()
+            self.set_position(STARTING_FEN, [])
+        elif command == "position":
+            self.stop()
+            self.position(arguments)
+        elif command == "go":
+            self.stop()
+            self.go(arguments)
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            return False
+        elif command == "d":
+            self.send(self.board.fen())
+        # Anything else, e.g. setoption, debug, register and ponderhit, is accepted and ignored
+        return True
+
+    def position(self, arguments: List[str]):
+        if "moves" in arguments:
+            split = arguments.index("moves")
+            setup, moves = arguments[:split], arguments[split + 1:]
+        else:
+            setup, moves = arguments, []
+        if setup[:1] == ["startpos"]:
+            fen = STARTING_FEN
+        elif setup[:1] == ["fen"] and len(setup) > 1:
+            fen = " ".join(setup[1:])
+        else:
+            self.send("info string position needs 'startpos' or 'fen <fen>'")
+            return
+        self.set_position(fen, moves)
+
+    def set_position(self, fen: str, moves: List[str]):
+        # Reuse the current board when it starts from the same position: take back only the moves that differ
+        # and play only the new ones, instead of replaying the whole game
+        try:
+            new_moves = [Move.from_uci(uci) for uci in moves]
+        except InvalidMoveError as error:
+            self.send(f"info string {error}")
+            return
+        if fen != self.base_fen:
+            try:
+                board = Board(fen)
+            except InvalidFenError as error:
+                self.send(f"info string {error}")
+                return
+            self.board = board
+            self.base_fen = fen
+        played = self.board.move_stack
+        common = 0
+        while common < min(len(played), len(new_moves)) and played[common] is new_moves[common]:
+            common += 1
+        while len(played) > common:
+            self.board.pop()
+        for move in new_moves[common:]:
+            # perform_move rather than push: the GUI may continue a game the rules would already call drawn
+            if not self.board.is_legal(move):
+                self.send(f"info string illegal move {move.uci()} in {self.board.fen()}")
+                return
+            self.board.perform_move(move)
+
+    def go(self, arguments: List[str]):
+        options = {}
+        infinite = False
+        i = 0
+        while i < len(arguments):
+            if arguments[i] in ("infinite", "ponder"):
+                infinite = True
+                i += 1
+            elif i + 1 < len(arguments):
+                try:
+                    options[arguments[i]] = int(arguments[i + 1])
+                except ValueError:
+                    pass
+                i += 2
+            else:
+                i += 1
+
+        depth = options.get("depth")
+        time_limit = None
+        if "movetime" in options:
+            time_limit = max(options["movetime"] / 1000 - MOVE_OVERHEAD, 0.01)
+        elif not infinite:
+            clock, increment = ("wtime", "winc") if self.board.turn is Color.WHITE else ("btime", "binc")
+            if clock in options:
+                remaining = options[clock] / 1000
+                moves_to_go = options.get("movestogo", DEFAULT_MOVES_TO_GO)
+                time_limit = remaining / max(moves_to_go, 1) + options.get(increment, 0) / 1000 * 0.8
+                time_limit = max(min(time_limit, remaining / 2 - MOVE_OVERHEAD), 0.01)
+        if infinite:
+            depth, time_limit = MAX_PLY, None
+
+        self._stop_requested.clear()
+        self.engine.reset_stop()
+        self._search_thread = threading.Thread(target=self._search, args=(self.board.copy(), depth, time_limit,
+                                                                          infinite), daemon=True)
+        self._search_thread.start()
+
+    def _search(self, board: Board, depth: Optional[int], time_limit: Optional[float], infinite: bool):
+        result = self.engine.search(board, depth, time_limit, info=lambda iteration: self.send(f"info {iteration}"),
+                                    keep_stop=True)
+        if infinite:
+            # In infinite mode the best move may only be sent once the GUI says stop
+            self._stop_requested.wait()
+        self.send(f"bestmove {result.best_move.uci() if result.best_move else '0000'}")
+
+    def stop(self):
+        # End the running search, if any, once its best move has been sent
+        if self._search_thread is not None:
+            self._stop_requested.set()
+            self.engine.stop()
+            self._search_thread.join()
+            self._search_thread = None
+
+
+def main(argv=None) -> int:
+    UciEngine().run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import random
+from typing import List
+
+from .bitboards import *
+
+# Fixed seed so hashes are stable across runs and processes
+_random = random.Random(0x2c5d_1e3b)
+
+# ZOBRIST_PIECES[piece_index][square], with piece_index as in Board.bitboards
+ZOBRIST_PIECES: List[List[int]] = [[_random.getrandbits(64) for _ in range(64)] for _ in range(12)]
+ZOBRIST_TURN: int = _random.getrandbits(64)     # Mixed in when black is to move
+ZOBRIST_EP_FILES: List[int] = [_random.getrandbits(64) for _ in range(8)]
+# One key per castling right, in the bit order of castling_index: K, Q, k, q
+_ZOBRIST_CASTLING_RIGHTS: List[int] = [_random.getrandbits(64) for _ in range(4)]
+
+
+def _castling_combination_key(index: int) -> int:
+    key = 0
+    for bit, right_key in enumerate(_ZOBRIST_CASTLING_RIGHTS):
+        if index & (1 << bit):
+            key ^= right_key
+    return key
+
+
+# Key of every combination of castling rights, indexed by castling_index(rights)
+ZOBRIST_CASTLING: List[int] = [_castling_combination_key(index) for index in range(16)]
+
+
+def castling_index(castling_rights: int) -> int:
+    # Map a castling rights mask of rook corners to 0..15
+    return ((castling_rights >> 7) & 1) | (castling_rights & 1) << 1 | \
+        ((castling_rights >> 63) & 1) << 2 | ((castling_rights >> 56) & 1) << 3
+
+
+def castling_key(castling_rights: int) -> int:
+    return ZOBRIST_CASTLING[castling_index(castling_rights)]
@@ -1,4 +1,10 @@
+import sys
+
 from chess import *
 
 if __name__ == "__main__":
+    if "--uci" in sys.argv[1:]:
+        # Headless engine driven over stdin/stdout
+        from chess.uci import main
+        sys.exit(main())
     start_game()
\ No newline at end of file
@@ -0,0 +1,35 @@
+import unittest
+
+from chess.board import Board
+from chess.moves import Move
+
+
+def play(board: Board, moves: str):
+    for uci in moves.split():
+        board.perform_move(Move.from_uci(uci))
+
+
+class OutcomeCacheTest(unittest.TestCase):
+    def test_repetition_after_replaying_a_different_history(self):
+        cycle = "g8f6 g1f3 f6g8 f3g1"
+        board = Board()
+        play(board, f"e2e4 {cycle} {cycle}")
+        self.assertTrue(board.is_threefold_repetition())
+        self.assertIsNotNone(board.outcome())
+
+        while board.move_stack:
+            board.pop()
+        # Same position, halfmove clock and last undo record, but the position has only been seen twice
+        moves = f"e2e3 b8c6 f1d3 c6b8 e3e4 g8f6 d3e2 f6g8 e2f1 {cycle}"
+        play(board, moves)
+        self.assertFalse(board.is_repetition(3))
+        self.assertIsNone(board.outcome())
+        self.assertFalse(board.is_terminated())
+
+        fresh = Board()
+        play(fresh, moves)
+        self.assertIsNone(fresh.outcome())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+
+from chess.board import Board
+from chess.engine import Engine
+
+
+class EngineStopTest(unittest.TestCase):
+    def test_search_after_stop(self):
+        # A stop left over from an earlier search does not cut a plain search short
+        engine = Engine(1 << 12)
+        engine.stop()
+        self.assertEqual(engine.search(Board(), depth=2).depth, 2)
+
+    def test_kept_stop_ends_search(self):
+        engine = Engine(1 << 12)
+        engine.stop()
+        self.assertEqual(engine.search(Board(), depth=2, keep_stop=True).depth, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import io
+import threading
+import time
+import unittest
+
+from chess.uci import UciEngine
+
+
+class _Output(io.StringIO):
+    # Collects the engine's output and wakes waiters on every line
+    def __init__(self):
+        super().__init__()
+        self.changed = threading.Condition()
+
+    def flush(self):
+        with self.changed:
+            self.changed.notify_all()
+
+    def wait_for(self, text: str, timeout: float) -> bool:
+        with self.changed:
+            return self.changed.wait_for(lambda: text in self.getvalue(), timeout)
+
+
+class UciStopTest(unittest.TestCase):
+    def test_stop_right_after_go_infinite(self):
+        output = _Output()
+        uci = UciEngine(output)
+        # Hold the search thread back so 'stop' arrives before the search has started
+        search = uci.engine.search
+
+        def delayed_search(*args, **kwargs):
+            time.sleep(0.05)
+            return search(*args, **kwargs)
+
+        uci.engine.search = delayed_search
+        uci.handle("position startpos")
+        uci.handle("go infinite")
+        # A lost stop would block forever on an infinite search, so stop from a helper thread
+        stopper = threading.Thread(target=uci.handle, args=("stop",), daemon=True)
+        stopper.start()
+        stopper.join(1.0)
+        self.assertFalse(stopper.is_alive(), "stop did not end the search")
+        self.assertTrue(output.wait_for("bestmove", 1.0))
+
+    def test_go_depth_after_stop(self):
+        # A stop left over from an earlier search must not cut the next one short
+        output = _Output()
+        uci = UciEngine(output)
+        uci.handle("stop")
+        uci.engine.stop()
+        uci.handle("position startpos")
+        uci.handle("go depth 2")
+        self.assertTrue(output.wait_for("bestmove", 30.0))
+        uci.stop()
+        self.assertIn("info depth 2", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()